@@ -0,0 +1,14 @@
+-- Migration: Add version column to ai_model table
+-- Run this script to upgrade existing databases
+-- The API uses version (incremented on every update) to validate cached /models/get
+-- responses and ETags; updated_at is a DATETIME with one-second precision.
+
+-- Add version column
+ALTER TABLE ai_model
+ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1 COMMENT '版本号';
+
+-- Verify column exists
+SELECT COLUMN_NAME, COLUMN_TYPE, COLUMN_COMMENT
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_NAME = 'ai_model'
+AND COLUMN_NAME = 'version';
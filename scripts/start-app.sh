@@ -104,7 +104,9 @@ if [ "$1" = "daemon" ]; then
     gunicorn \
         --bind ${HOST}:${PORT} \
         --workers 4 \
-        --threads 2 \
+        --worker-class gthread \
+        --threads 8 \
+        --keep-alive 60 \
         --timeout 300 \
         --access-logfile - \
         --error-logfile - \
@@ -0,0 +1,8 @@
+"""
+Cache - API 响应缓存
+"""
+
+from flask_caching import Cache
+
+# 全局缓存实例，在 create_app 中通过 init_app 绑定应用
+cache = Cache()
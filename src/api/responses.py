@@ -0,0 +1,188 @@
+"""
+Responses - 基于 orjson 的 JSON 响应工具
+"""
+
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Type
+
+import orjson
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.engine import RowMapping
+
+from .schemas.common import is_resource_id
+
+
+def _default(obj: Any) -> Any:
+    """
+    orjson 无法原生序列化的类型回退处理
+
+    - RowMapping（列投影查询结果）转换为 dict
+    - ORM 模型实例通过其 to_dict() 序列化，路由可直接返回模型对象
+    - 其余类型（Decimal、date、dataclass 等）沿用 Flask 默认处理
+    """
+    if isinstance(obj, RowMapping):
+        return dict(obj)
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    return DefaultJSONProvider.default(obj)
+
+
+class OrJSONProvider(DefaultJSONProvider):
+    """
+    OrJSONProvider - 基于 orjson 的 Flask JSON Provider
+
+    替换 Flask 默认的标准库 json，request.get_json()、jsonify() 及视图返回的 dict 统一使用 orjson。
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """
+        jsonify() 及视图直接返回 dict 时使用
+
+        直接以 orjson 输出的字节串构建响应，省去 dumps() 解码为 str 后再编码的往返。
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def json_response(payload: Any, status: int = 200, etag: Optional[str] = None) -> Response:
+    """
+    使用 orjson 序列化并构建 JSON 响应
+
+    orjson 原生支持 datetime / UUID，序列化速度远快于 flask.jsonify 使用的标准库 json。
+
+    Args:
+        payload: 响应数据
+        status: HTTP 状态码
+        etag: 资源版本标识（可选），设置到 ETag 响应头
+
+    Returns:
+        Flask Response 实例
+    """
+    return bytes_response(dumps(payload), status=status, etag=etag)
+
+
+def dumps(payload: Any) -> bytes:
+    """使用 orjson 将响应数据序列化为 JSON 字节串"""
+    return orjson.dumps(payload, default=_default)
+
+
+def bytes_response(body: bytes, status: int = 200, etag: Optional[str] = None) -> Response:
+    """
+    使用已序列化的 JSON 字节串构建响应（用于返回缓存的响应体）
+
+    Args:
+        body: JSON 字节串
+        status: HTTP 状态码
+        etag: 资源版本标识（可选），设置到 ETag 响应头
+
+    Returns:
+        Flask Response 实例
+    """
+    response = Response(body, status=status, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    根据资源版本信息生成 ETag
+
+    Args:
+        parts: 能唯一确定响应内容的版本信息（如 id、updated_at、分页参数）
+
+    Returns:
+        16 位十六进制摘要
+    """
+    raw = ':'.join(str(part) for part in parts)
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def content_etag(body: bytes) -> str:
+    """
+    根据已序列化的响应体生成 ETag（内容摘要，适用于没有版本号可用的响应）
+
+    Args:
+        body: JSON 字节串
+
+    Returns:
+        16 位十六进制摘要
+    """
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def not_modified(etag: str) -> Response:
+    """构建 304 Not Modified 响应（无响应体，跳过序列化）"""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def json_endpoint(
+    adapter: Optional[TypeAdapter] = None,
+    errors: Optional[Dict[Type[Exception], int]] = None
+) -> Callable:
+    """
+    JSON 接口装饰器
+
+    统一完成请求体解析、参数校验和异常处理：校验失败返回 400，
+    errors 中声明的异常返回对应状态码，其余未处理异常返回 500。
+    请求体由 pydantic 直接从原始字节解析并校验（validate_json），无需先构建中间 dict。
+
+    Args:
+        adapter: 请求模型的 TypeAdapter，为 None 时不解析请求体
+        errors: 异常类型到 HTTP 状态码的映射（如 {ValueError: 404}）
+
+    Returns:
+        装饰器，被装饰的视图函数接收校验后的请求对象
+    """
+    error_map = tuple((errors or {}).items())
+
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper():
+            try:
+                if adapter is None:
+                    return fn()
+                return fn(adapter.validate_json(request.get_data() or b'{}'))
+            except ValidationError as e:
+                return json_response({'code': 400, 'success': False, 'error': str(e)}, 400)
+            except Exception as e:
+                status = next((code for exc_type, code in error_map if isinstance(e, exc_type)), 500)
+                return json_response({'code': status, 'success': False, 'error': str(e)}, status)
+        return wrapper
+    return decorator
+
+
+def require_resource_id(not_found_body: bytes) -> Callable:
+    """
+    资源 ID 格式校验装饰器
+
+    置于 json_endpoint 之下，被装饰的视图函数接收带 id 字段的请求对象。
+    ID 不是合法的资源 ID（UUID 字符串）时不可能命中任何记录，直接返回 404，无需查询数据库。
+
+    Args:
+        not_found_body: 预序列化的 404 响应体
+
+    Returns:
+        装饰器
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(req):
+            if not is_resource_id(req.id):
+                return bytes_response(not_found_body, 404)
+            return fn(req)
+        return wrapper
+    return decorator
@@ -2,11 +2,34 @@
 Health Routes - 健康检查路由
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from flasgger import swag_from
 
+from ..responses import bytes_response, dumps
+
 health_bp = Blueprint('health', __name__)
 
+# 响应内容固定，导入时序列化一次（/health 会被负载均衡和容器探针高频调用）
+_HEALTH_BODY = dumps({
+    'status': 'healthy',
+    'service': 'op-stack-executor',
+    'version': '1.0.0'
+})
+
+_API_INFO_BODY = dumps({
+    'name': 'Op-Stack Executor API',
+    'version': '1.0.0',
+    'description': '层级多智能体系统执行器 API',
+    'endpoints': {
+        'health': '/health',
+        'swagger_ui': '/swagger-ui.html',
+        'openapi_json': '/v3/api-docs',
+        'models': '/api/executor/v1/models/*',
+        'hierarchies': '/api/executor/v1/hierarchies/*',
+        'runs': '/api/executor/v1/runs/*'
+    }
+})
+
 
 @health_bp.route('/health', methods=['GET'])
 @swag_from({
@@ -29,11 +52,7 @@ health_bp = Blueprint('health', __name__)
 })
 def health_check():
     """健康检查"""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'op-stack-executor',
-        'version': '1.0.0'
-    })
+    return bytes_response(_HEALTH_BODY)
 
 
 @health_bp.route('/', methods=['GET'])
@@ -69,16 +88,4 @@ def health_check():
 })
 def api_info():
     """API 信息"""
-    return jsonify({
-        'name': 'Op-Stack Executor API',
-        'version': '1.0.0',
-        'description': '层级多智能体系统执行器 API',
-        'endpoints': {
-            'health': '/health',
-            'swagger_ui': '/swagger-ui.html',
-            'openapi_json': '/v3/api-docs',
-            'models': '/api/executor/v1/models/*',
-            'hierarchies': '/api/executor/v1/hierarchies/*',
-            'runs': '/api/executor/v1/runs/*'
-        }
-    })
+    return bytes_response(_API_INFO_BODY)
@@ -2,14 +2,19 @@
 Hierarchies Routes - 层级团队管理路由
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from flasgger import swag_from
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.exc import IntegrityError
 
 from ..schemas.hierarchy_schemas import (
     HierarchyCreateRequest, HierarchyUpdateRequest, HierarchyListRequest
 )
 from ..schemas.common import IdRequest, build_page_response
+from ..cache import cache
+from ..responses import (
+    json_response, json_endpoint, require_resource_id, bytes_response, dumps, make_etag, not_modified
+)
 from ...db.database import get_db_session
 from ...db.repositories import HierarchyRepository
 from ...db.repositories.hierarchy_repo import check_agent_ids_unique_in_hierarchy
@@ -17,6 +22,29 @@ from ...db.repositories.hierarchy_repo import check_agent_ids_unique_in_hierarch
 
 hierarchies_bp = Blueprint('hierarchies', __name__)
 
+# 请求校验器在导入时构建一次，处理请求时直接复用
+_LIST_ADAPTER = TypeAdapter(HierarchyListRequest)
+_ID_ADAPTER = TypeAdapter(IdRequest)
+_CREATE_ADAPTER = TypeAdapter(HierarchyCreateRequest)
+_UPDATE_ADAPTER = TypeAdapter(HierarchyUpdateRequest)
+
+# 固定的错误响应体，导入时序列化一次
+_NOT_FOUND_BODY = dumps({'success': False, 'error': '层级团队不存在'})
+
+# /get 响应缓存：按层级团队 ID 缓存 (version, 响应体)
+# 层级配置 JSON 较大且前端会反复拉取；命中前先校验 version（每次更新自增），其他 worker 的更新不会返回过期数据
+_HIERARCHY_CACHE_TIMEOUT = 300
+
+# 创建请求中持久化到 config JSON 的字段（与请求模型字段顺序一致）
+_CONFIG_FIELDS = frozenset({
+    'execution_mode', 'enable_context_sharing', 'global_supervisor_agent', 'teams'
+})
+
+
+def _hierarchy_cache_key(hierarchy_id: str) -> str:
+    """层级团队详情缓存键"""
+    return f'hierarchy:{hierarchy_id}'
+
 
 def get_repo():
     """获取层级团队仓库"""
@@ -80,46 +108,40 @@ def get_repo():
         }
     }
 })
-def list_hierarchies():
+@json_endpoint(_LIST_ADAPTER)
+def list_hierarchies(req: HierarchyListRequest):
     """获取层级团队列表"""
-    try:
-        data = request.get_json() or {}
-        req = HierarchyListRequest(**data)
-
-        repo = get_repo()
-        hierarchies, total = repo.list(
-            page=req.page,
-            size=req.size,
-            is_active=req.is_active
-        )
+    repo = get_repo()
+    hierarchies, total = repo.list(
+        page=req.page,
+        size=req.size,
+        is_active=req.is_active
+    )
+
+    # 返回简化的列表项
+    content = []
+    for h in hierarchies:
+        config = h.config or {}
+        item = {
+            'id': h.id,
+            'name': h.name,
+            'description': h.description,
+            'execution_mode': config.get('execution_mode', 'sequential'),
+            'team_count': len(config.get('teams', [])),
+            'is_active': h.is_active,
+            'version': h.version,
+            # datetime 交由 orjson 原生序列化为 ISO 8601
+            'created_at': h.created_at,
+            'updated_at': h.updated_at,
+        }
+        content.append(item)
 
-        # 返回简化的列表项
-        content = []
-        for h in hierarchies:
-            config = h.config or {}
-            item = {
-                'id': h.id,
-                'name': h.name,
-                'description': h.description,
-                'execution_mode': config.get('execution_mode', 'sequential'),
-                'team_count': len(config.get('teams', [])),
-                'is_active': h.is_active,
-                'version': h.version,
-                'created_at': h.created_at.isoformat() if h.created_at else None,
-                'updated_at': h.updated_at.isoformat() if h.updated_at else None,
-            }
-            content.append(item)
-
-        return jsonify(build_page_response(
-            content=content,
-            page=req.page,
-            size=req.size,
-            total=total
-        ))
-    except ValidationError as e:
-        return jsonify({'code': 400, 'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'code': 500, 'success': False, 'error': str(e)}), 500
+    return json_response(build_page_response(
+        content=content,
+        page=req.page,
+        size=req.size,
+        total=total
+    ))
 
 
 @hierarchies_bp.route('/get', methods=['POST'])
@@ -165,26 +187,36 @@ def list_hierarchies():
         404: {'description': '层级团队不存在'}
     }
 })
-def get_hierarchy():
+@json_endpoint(_ID_ADAPTER)
+@require_resource_id(_NOT_FOUND_BODY)
+def get_hierarchy(req: IdRequest):
     """获取层级团队详情"""
-    try:
-        data = request.get_json() or {}
-        req = IdRequest(**data)
+    repo = get_repo()
+    version = repo.get_version(req.id)
 
-        repo = get_repo()
-        hierarchy = repo.get_by_id(req.id)
+    if not version:
+        return bytes_response(_NOT_FOUND_BODY, 404)
 
-        if not hierarchy:
-            return jsonify({'success': False, 'error': '层级团队不存在'}), 404
+    etag = make_etag(req.id, version[0])
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
 
-        return jsonify({
-            'success': True,
-            'data': hierarchy.to_dict()
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # 缓存命中且版本一致时直接返回已序列化的响应体，跳过 ORM 查询和配置 JSON 的序列化
+    key = _hierarchy_cache_key(req.id)
+    cached = cache.get(key)
+    if cached and cached[0] == version[0]:
+        return bytes_response(cached[1], etag=etag)
+
+    hierarchy = repo.get_by_id(req.id)
+    if not hierarchy:
+        return bytes_response(_NOT_FOUND_BODY, 404)
+
+    body = dumps({
+        'success': True,
+        'data': hierarchy
+    })
+    cache.set(key, (hierarchy.version, body), timeout=_HIERARCHY_CACHE_TIMEOUT)
+    return bytes_response(body, etag=make_etag(req.id, hierarchy.version))
 
 
 @hierarchies_bp.route('/create', methods=['POST'])
@@ -345,47 +377,36 @@ Global Supervisor (全局协调者)
 })
 def create_hierarchy():
     """创建层级团队"""
-    import json
-    try:
-        data = request.get_json() or {}
+    body = request.get_data() or b'{}'
 
-        # 打印接收到的完整请求参数
-        print(f"\n[hierarchies/create] 收到请求参数:", flush=True)
-        print(json.dumps(data, indent=2, ensure_ascii=False), flush=True)
+    # 打印接收到的完整请求参数（原始请求体，无需解析后再序列化）
+    print(f"\n[hierarchies/create] 收到请求参数:", flush=True)
+    print(body.decode('utf-8', errors='replace'), flush=True)
 
-        req = HierarchyCreateRequest(**data)
-
-        repo = get_repo()
+    try:
+        # 由 pydantic 直接从原始字节解析并校验
+        req = _CREATE_ADAPTER.validate_json(body)
 
-        # 检查名称是否重复
-        if repo.get_by_name(req.name):
-            return jsonify({'success': False, 'error': f'层级团队名称 "{req.name}" 已存在'}), 400
-
-        # 构建 config JSON
-        config = {
-            'execution_mode': req.execution_mode,
-            'enable_context_sharing': req.enable_context_sharing,
-            'global_supervisor_agent': req.global_supervisor_agent.model_dump(),
-            'teams': [team.model_dump() for team in req.teams]
-        }
+        # 构建 config JSON（一次序列化整个请求模型，无需逐个团队调用 model_dump）
+        config = req.model_dump(include=_CONFIG_FIELDS)
 
         # 验证 agent_id 唯一性
         is_unique, duplicate_id = check_agent_ids_unique_in_hierarchy(config)
         if not is_unique:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'error': f"agent_id '{duplicate_id}' is duplicated within this hierarchy",
                 'code': 400001
-            }), 400
+            }, 400)
 
-        # 创建 Hierarchy
-        hierarchy = repo.create(
+        # 创建 Hierarchy（名称唯一性交由数据库唯一索引校验，避免额外的 SELECT）
+        hierarchy = get_repo().create(
             name=req.name,
             description=req.description,
             config=config
         )
 
-        return jsonify({
+        return json_response({
             'success': True,
             'message': '层级团队创建成功',
             'data': hierarchy.to_dict()
@@ -404,14 +425,18 @@ def create_hierarchy():
                 'type': error_type
             })
         print(f"[hierarchies/create] 验证失败: {error_details}", flush=True)
-        return jsonify({
+        return json_response({
             'success': False,
             'error': '请求参数验证失败',
             'details': error_details
-        }), 400
+        }, 400)
+    except IntegrityError:
+        # 只有写入数据库时会触发，对应名称唯一索引冲突
+        return json_response({'success': False, 'error': f'层级团队名称 "{req.name}" 已存在'}, 400)
     except Exception as e:
+        # 其余异常统一返回 JSON 错误响应
         print(f"[hierarchies/create] 异常: {str(e)}", flush=True)
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}, 500)
 
 
 @hierarchies_bp.route('/update', methods=['POST'])
@@ -466,72 +491,65 @@ def create_hierarchy():
         404: {'description': '层级团队不存在'}
     }
 })
-def update_hierarchy():
+@json_endpoint(_UPDATE_ADAPTER)
+@require_resource_id(_NOT_FOUND_BODY)
+def update_hierarchy(req: HierarchyUpdateRequest):
     """更新层级团队"""
-    try:
-        data = request.get_json() or {}
-        req = HierarchyUpdateRequest(**data)
-
-        repo = get_repo()
-
-        # 检查名称是否与其他层级重复
-        if req.name:
-            existing = repo.get_by_name(req.name)
-            if existing and existing.id != req.id:
-                return jsonify({'success': False, 'error': f'层级团队名称 "{req.name}" 已存在'}), 400
-
-        # 构建更新数据
-        update_data = {}
-        if req.name:
-            update_data['name'] = req.name
-        if req.description is not None:
-            update_data['description'] = req.description
-        if req.is_active is not None:
-            update_data['is_active'] = req.is_active
-
-        # 如果有配置更新，构建新的 config
-        if req.global_supervisor_agent or req.teams or req.execution_mode or req.enable_context_sharing is not None:
-            # 获取现有配置
-            hierarchy = repo.get_by_id(req.id)
-            if not hierarchy:
-                return jsonify({'success': False, 'error': '层级团队不存在'}), 404
-
-            config = hierarchy.config.copy() if hierarchy.config else {}
-
-            if req.execution_mode:
-                config['execution_mode'] = req.execution_mode
-            if req.enable_context_sharing is not None:
-                config['enable_context_sharing'] = req.enable_context_sharing
-            if req.global_supervisor_agent:
-                config['global_supervisor_agent'] = req.global_supervisor_agent.model_dump()
-            if req.teams:
-                config['teams'] = [team.model_dump() for team in req.teams]
-
-            # 验证 agent_id 唯一性
-            is_unique, duplicate_id = check_agent_ids_unique_in_hierarchy(config)
-            if not is_unique:
-                return jsonify({
-                    'success': False,
-                    'error': f"agent_id '{duplicate_id}' is duplicated within this hierarchy",
-                    'code': 400001
-                }), 400
-
-            update_data['config'] = config
+    repo = get_repo()
+
+    # 构建更新数据
+    update_data = {}
+    if req.name:
+        update_data['name'] = req.name
+    if req.description is not None:
+        update_data['description'] = req.description
+    if req.is_active is not None:
+        update_data['is_active'] = req.is_active
+
+    # 如果有配置更新，构建新的 config
+    if req.global_supervisor_agent or req.teams or req.execution_mode or req.enable_context_sharing is not None:
+        # 获取现有配置
+        hierarchy = repo.get_by_id(req.id)
+        if not hierarchy:
+            return bytes_response(_NOT_FOUND_BODY, 404)
+
+        config = hierarchy.config.copy() if hierarchy.config else {}
+
+        if req.execution_mode:
+            config['execution_mode'] = req.execution_mode
+        if req.enable_context_sharing is not None:
+            config['enable_context_sharing'] = req.enable_context_sharing
+        if req.global_supervisor_agent:
+            config['global_supervisor_agent'] = req.global_supervisor_agent.model_dump()
+        if req.teams:
+            config['teams'] = [team.model_dump() for team in req.teams]
+
+        # 验证 agent_id 唯一性
+        is_unique, duplicate_id = check_agent_ids_unique_in_hierarchy(config)
+        if not is_unique:
+            return json_response({
+                'success': False,
+                'error': f"agent_id '{duplicate_id}' is duplicated within this hierarchy",
+                'code': 400001
+            }, 400)
+
+        update_data['config'] = config
 
+    # 名称唯一性交由数据库唯一索引校验，避免额外的 SELECT
+    try:
         hierarchy = repo.update(req.id, update_data)
+    except IntegrityError:
+        return json_response({'success': False, 'error': f'层级团队名称 "{req.name}" 已存在'}, 400)
 
-        if not hierarchy:
-            return jsonify({'success': False, 'error': '层级团队不存在'}), 404
+    if not hierarchy:
+        return bytes_response(_NOT_FOUND_BODY, 404)
 
-        return jsonify({
-            'success': True,
-            'message': '层级团队更新成功',
-            'data': hierarchy.to_dict()
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    cache.delete(_hierarchy_cache_key(req.id))
+    return json_response({
+        'success': True,
+        'message': '层级团队更新成功',
+        'data': hierarchy.to_dict()
+    })
 
 
 @hierarchies_bp.route('/delete', methods=['POST'])
@@ -568,23 +586,18 @@ def update_hierarchy():
         404: {'description': '层级团队不存在'}
     }
 })
-def delete_hierarchy():
+@json_endpoint(_ID_ADAPTER)
+@require_resource_id(_NOT_FOUND_BODY)
+def delete_hierarchy(req: IdRequest):
     """删除层级团队"""
-    try:
-        data = request.get_json() or {}
-        req = IdRequest(**data)
-
-        repo = get_repo()
-        success = repo.delete(req.id)
+    repo = get_repo()
+    success = repo.delete(req.id)
 
-        if not success:
-            return jsonify({'success': False, 'error': '层级团队不存在'}), 404
+    if not success:
+        return bytes_response(_NOT_FOUND_BODY, 404)
 
-        return jsonify({
-            'success': True,
-            'message': '层级团队删除成功'
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    cache.delete(_hierarchy_cache_key(req.id))
+    return json_response({
+        'success': True,
+        'message': '层级团队删除成功'
+    })
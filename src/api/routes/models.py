@@ -2,31 +2,97 @@
 Models Routes - AI 模型管理路由
 """
 
-from flask import Blueprint, request, jsonify
+import time
+
+from flask import Blueprint, request, g
 from flasgger import swag_from
-from pydantic import ValidationError
+from pydantic import TypeAdapter
+from sqlalchemy.exc import IntegrityError
 
 from ..schemas.model_schemas import (
     ModelCreateRequest, ModelUpdateRequest, ModelListRequest
 )
 from ..schemas.common import IdRequest, build_page_response
+from ..cache import cache
+from ..responses import (
+    json_response, json_endpoint, require_resource_id, bytes_response,
+    dumps, make_etag, content_etag, not_modified
+)
 from ...db.database import get_db_session
 from ...db.repositories import ModelRepository
 
 models_bp = Blueprint('models', __name__)
 
+# 请求校验器在导入时构建一次，处理请求时直接复用
+_LIST_ADAPTER = TypeAdapter(ModelListRequest)
+_ID_ADAPTER = TypeAdapter(IdRequest)
+_CREATE_ADAPTER = TypeAdapter(ModelCreateRequest)
+_UPDATE_ADAPTER = TypeAdapter(ModelUpdateRequest)
+
+# /list 总数缓存：按 is_active 过滤条件缓存总数
+# 本进程内的写操作会立即失效缓存，其他 worker 的写操作最多在 TTL 后可见（仅影响 totalElements）
+# 缓存为 (创建时间, {is_active: 总数}) 元组，多个请求线程共享：过期和失效时整体替换为新元组，
+# 读取方始终拿到一致的时间和总数，持有旧元组的线程写入的总数随旧元组一起丢弃
+_STATS_CACHE_TTL = 5.0
+_stats_cache = (0.0, {})
+
+
+def _cached_count(repo: ModelRepository, is_active):
+    """获取模型总数，TTL 内复用缓存结果"""
+    global _stats_cache
+    created_at, counts = _stats_cache
+    now = time.monotonic()
+    if now - created_at >= _STATS_CACHE_TTL:
+        counts = {}
+        _stats_cache = (now, counts)
+
+    count = counts.get(is_active)
+    if count is None:
+        count = counts[is_active] = repo.count(is_active)
+    return count
+
+
+def _invalidate_stats_cache():
+    """模型总数可能变化时使统计缓存失效"""
+    global _stats_cache
+    _stats_cache = (0.0, {})
+
+
+# /get 响应缓存：按模型 ID 缓存 (version, 响应体)
+# 命中前先校验 version（每次更新在数据库端自增），其他 worker 的更新不会返回过期数据；
+# 不使用 updated_at：DATETIME 只精确到秒，同一秒内的两次更新无法区分
+_MODEL_CACHE_TIMEOUT = 300
+
+# 固定的错误响应体，导入时序列化一次
+_NOT_FOUND_BODY = dumps({'success': False, 'error': '模型不存在'})
+
+
+def _model_cache_key(model_id: str) -> str:
+    """模型详情缓存键"""
+    return f'model:{model_id}'
+
 
 def get_repo():
-    """获取模型仓库"""
-    return ModelRepository(get_db_session())
+    """
+    获取模型仓库
 
+    同一请求内复用同一个仓库实例，会话由应用的 teardown_appcontext 统一回收。
+    """
+    if 'model_repo' not in g:
+        g.model_repo = ModelRepository(get_db_session())
+    return g.model_repo
 
-@models_bp.route('/list', methods=['POST'])
-@swag_from({
+
+_LIST_SPEC = {
     'tags': ['Models'],
     'summary': '获取模型列表',
     'description': '''分页获取 AI 模型配置列表。
 
+支持两种分页方式：传 `page` 使用页码分页；传 `cursor`（上一页返回的 `nextCursor`）使用游标分页，深翻页时性能更稳定。
+
+`totalElements` 按进程缓存 5 秒，多进程部署时其他进程的增删最多 5 秒后体现在总数中；列表内容始终为最新数据。
+响应带 `ETag`（响应体摘要），携带 `If-None-Match` 且内容未变化时返回 304。
+
 模型配置用于定义 Agent 使用的底层 LLM 参数，包括 AWS Bedrock 模型 ID、区域、温度、最大 Token 数等。
 ''',
     'parameters': [{
@@ -38,7 +104,13 @@ def get_repo():
             'properties': {
                 'page': {'type': 'integer', 'default': 1, 'description': '页码，从 1 开始'},
                 'size': {'type': 'integer', 'default': 20, 'description': '每页数量，范围 1-100'},
-                'is_active': {'type': 'boolean', 'description': '按激活状态筛选，true=已激活，false=已禁用，不传=全部'}
+                'is_active': {'type': 'boolean', 'description': '按激活状态筛选，true=已激活，false=已禁用，不传=全部'},
+                'cursor': {'type': 'string', 'description': '游标分页：传入上一页返回的 nextCursor，传入时忽略 page'},
+                'ids': {
+                    'type': 'array',
+                    'items': {'type': 'string'},
+                    'description': '按模型 ID 批量查询（最多 100 个），替代逐个调用 /get'
+                }
             }
         }
     }],
@@ -65,14 +137,17 @@ def get_repo():
                                         'temperature': {'type': 'number', 'description': '温度参数 (0-1)'},
                                         'max_tokens': {'type': 'integer', 'description': '最大 Token 数'},
                                         'top_p': {'type': 'number', 'description': 'Top-P 参数'},
-                                        'is_active': {'type': 'boolean', 'description': '是否激活'}
+                                        'is_active': {'type': 'boolean', 'description': '是否激活'},
+                                        'created_at': {'type': 'string', 'format': 'date-time'},
+                                        'updated_at': {'type': 'string', 'format': 'date-time'}
                                     }
                                 }
                             },
                             'page': {'type': 'integer'},
                             'size': {'type': 'integer'},
                             'totalElements': {'type': 'integer'},
-                            'totalPages': {'type': 'integer'}
+                            'totalPages': {'type': 'integer'},
+                            'nextCursor': {'type': 'string', 'description': '下一页游标，没有下一页时不返回'}
                         }
                     }
                 }
@@ -80,34 +155,46 @@ def get_repo():
         },
         500: {'description': '服务器错误'}
     }
-})
-def list_models():
+}
+
+
+@models_bp.route('/list', methods=['POST'])
+@swag_from(_LIST_SPEC)
+@json_endpoint(_LIST_ADAPTER)
+def list_models(req: ModelListRequest):
     """获取模型列表"""
-    try:
-        data = request.get_json() or {}
-        req = ModelListRequest(**data)
+    repo = get_repo()
 
-        repo = get_repo()
-        models, total = repo.list(
+    try:
+        rows, total, next_cursor = repo.list_summary(
             page=req.page,
             size=req.size,
-            is_active=req.is_active
+            is_active=req.is_active,
+            cursor=req.cursor,
+            # 批量查询时缓存的总数不适用，由仓储按 ids 重新计数
+            total=_cached_count(repo, req.is_active) if req.ids is None else None,
+            ids=req.ids
         )
-
-        return jsonify(build_page_response(
-            content=[m.to_dict() for m in models],
-            page=req.page,
-            size=req.size,
-            total=total
-        ))
-    except ValidationError as e:
-        return jsonify({'code': 400, 'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'code': 500, 'success': False, 'error': str(e)}), 500
-
-
-@models_bp.route('/get', methods=['POST'])
-@swag_from({
+    except ValueError as e:
+        # 游标无效
+        return json_response({'code': 400, 'success': False, 'error': str(e)}, 400)
+
+    body = dumps(build_page_response(
+        content=rows,
+        page=req.page,
+        size=req.size,
+        total=total,
+        next_cursor=next_cursor
+    ))
+
+    # ETag 取响应体摘要，与实际返回的内容一致；内容未变化时返回 304，省去响应体传输
+    etag = content_etag(body)
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+    return bytes_response(body, etag=etag)
+
+
+_GET_SPEC = {
     'tags': ['Models'],
     'summary': '获取模型详情',
     'description': '根据模型 ID 获取模型的详细配置信息，包括 AWS Bedrock 参数和激活状态。',
@@ -160,31 +247,45 @@ def list_models():
             }
         }
     }
-})
-def get_model():
+}
+
+
+@models_bp.route('/get', methods=['POST'])
+@swag_from(_GET_SPEC)
+@json_endpoint(_ID_ADAPTER)
+@require_resource_id(_NOT_FOUND_BODY)
+def get_model(req: IdRequest):
     """获取模型详情"""
-    try:
-        data = request.get_json() or {}
-        req = IdRequest(**data)
+    repo = get_repo()
+    version = repo.get_version(req.id)
 
-        repo = get_repo()
-        model = repo.get_by_id(req.id)
+    if not version:
+        return bytes_response(_NOT_FOUND_BODY, 404)
 
-        if not model:
-            return jsonify({'success': False, 'error': '模型不存在'}), 404
+    # ETag 由版本号生成，同一秒内的多次更新也会产生不同的 ETag
+    etag = make_etag(req.id, version[0])
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
 
-        return jsonify({
-            'success': True,
-            'data': model.to_dict()
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # 缓存命中且版本一致时直接返回已序列化的响应体，跳过 ORM 查询和序列化
+    key = _model_cache_key(req.id)
+    cached = cache.get(key)
+    if cached and cached[0] == version[0]:
+        return bytes_response(cached[1], etag=etag)
 
+    model = repo.get_by_id(req.id)
+    if not model:
+        return bytes_response(_NOT_FOUND_BODY, 404)
 
-@models_bp.route('/create', methods=['POST'])
-@swag_from({
+    body = dumps({
+        'success': True,
+        'data': model
+    })
+    cache.set(key, (model.version, body), timeout=_MODEL_CACHE_TIMEOUT)
+    return bytes_response(body, etag=make_etag(req.id, model.version))
+
+
+_CREATE_SPEC = {
     'tags': ['Models'],
     'summary': '创建模型',
     'description': '''创建新的 AI 模型配置。
@@ -258,34 +359,32 @@ def get_model():
             }
         }
     }
-})
-def create_model():
-    """创建模型"""
-    try:
-        data = request.get_json() or {}
-        req = ModelCreateRequest(**data)
+}
 
-        repo = get_repo()
 
-        # 检查名称是否重复
-        if repo.get_by_name(req.name):
-            return jsonify({'success': False, 'error': f'模型名称 "{req.name}" 已存在'}), 400
+@models_bp.route('/create', methods=['POST'])
+@swag_from(_CREATE_SPEC)
+@json_endpoint(_CREATE_ADAPTER)
+def create_model(req: ModelCreateRequest):
+    """创建模型"""
+    repo = get_repo()
 
+    # 名称唯一性交由数据库唯一索引校验，避免额外的 SELECT
+    try:
         model = repo.create(req.model_dump())
+    except IntegrityError:
+        return json_response({'success': False, 'error': f'模型名称 "{req.name}" 已存在'}, 400)
 
-        return jsonify({
-            'success': True,
-            'message': '模型创建成功',
-            'data': model.to_dict()
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    _invalidate_stats_cache()
 
+    return json_response({
+        'success': True,
+        'message': '模型创建成功',
+        'data': model
+    })
 
-@models_bp.route('/update', methods=['POST'])
-@swag_from({
+
+_UPDATE_SPEC = {
     'tags': ['Models'],
     'summary': '更新模型',
     'description': '''更新模型配置信息。
@@ -345,42 +444,42 @@ def create_model():
             }
         }
     }
-})
-def update_model():
-    """更新模型"""
-    try:
-        data = request.get_json() or {}
-        req = ModelUpdateRequest(**data)
+}
 
-        repo = get_repo()
 
-        # 过滤掉 None 值
-        update_data = {k: v for k, v in req.model_dump().items() if v is not None and k != 'id'}
+@models_bp.route('/update', methods=['POST'])
+@swag_from(_UPDATE_SPEC)
+@json_endpoint(_UPDATE_ADAPTER)
+@require_resource_id(_NOT_FOUND_BODY)
+def update_model(req: ModelUpdateRequest):
+    """更新模型"""
+    repo = get_repo()
 
-        # 检查名称是否与其他模型重复
-        if 'name' in update_data:
-            existing = repo.get_by_name(update_data['name'])
-            if existing and existing.id != req.id:
-                return jsonify({'success': False, 'error': f'模型名称 "{update_data["name"]}" 已存在'}), 400
+    # 过滤掉 None 值
+    update_data = req.model_dump(exclude_none=True, exclude={'id'})
 
+    # 名称唯一性交由数据库唯一索引校验，避免额外的 SELECT
+    try:
         model = repo.update(req.id, update_data)
+    except IntegrityError:
+        return json_response({'success': False, 'error': f'模型名称 "{req.name}" 已存在'}, 400)
 
-        if not model:
-            return jsonify({'success': False, 'error': '模型不存在'}), 404
+    if not model:
+        return bytes_response(_NOT_FOUND_BODY, 404)
 
-        return jsonify({
-            'success': True,
-            'message': '模型更新成功',
-            'data': model.to_dict()
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # 缓存的总数只按 is_active 筛选，只有修改激活状态时才会变化
+    if 'is_active' in update_data:
+        _invalidate_stats_cache()
+    cache.delete(_model_cache_key(req.id))
 
+    return json_response({
+        'success': True,
+        'message': '模型更新成功',
+        'data': model
+    })
 
-@models_bp.route('/delete', methods=['POST'])
-@swag_from({
+
+_DELETE_SPEC = {
     'tags': ['Models'],
     'summary': '删除模型',
     'description': '''删除指定的模型配置。
@@ -421,24 +520,25 @@ def update_model():
             }
         }
     }
-})
-def delete_model():
+}
+
+
+@models_bp.route('/delete', methods=['POST'])
+@swag_from(_DELETE_SPEC)
+@json_endpoint(_ID_ADAPTER)
+@require_resource_id(_NOT_FOUND_BODY)
+def delete_model(req: IdRequest):
     """删除模型"""
-    try:
-        data = request.get_json() or {}
-        req = IdRequest(**data)
-
-        repo = get_repo()
-        success = repo.delete(req.id)
-
-        if not success:
-            return jsonify({'success': False, 'error': '模型不存在'}), 404
-
-        return jsonify({
-            'success': True,
-            'message': '模型删除成功'
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    repo = get_repo()
+    success = repo.delete(req.id)
+
+    if not success:
+        return bytes_response(_NOT_FOUND_BODY, 404)
+
+    _invalidate_stats_cache()
+    cache.delete(_model_cache_key(req.id))
+
+    return json_response({
+        'success': True,
+        'message': '模型删除成功'
+    })
@@ -2,40 +2,141 @@
 Runs Routes - 运行管理路由
 """
 
-from flask import Blueprint, request, jsonify
+import functools
+import itertools
+from typing import Optional
+
+import redis
+from flask import Blueprint, Response, request
 from flasgger import swag_from
-from pydantic import ValidationError
+from pydantic import TypeAdapter
 
 from ..schemas.run_schemas import (
     RunStartRequest, RunListRequest, RunStreamRequest, RunCancelRequest,
-    EventQueryRequest
+    EventQueryRequest, RunStartResponse
 )
-from ..schemas.common import IdRequest, RunIdRequest, build_page_response
-from ...db.database import get_db_session, db
+from ..schemas.common import IdRequest, RunIdRequest, build_page_response, is_stream_id
+from ..responses import json_response, json_endpoint, bytes_response, dumps
+from ...db.database import get_db_session, create_new_session
+from ...db.models import RUN_STATUSES, TERMINAL_STATUSES
 from ...db.repositories import RunRepository
-from ...runner.run_manager import RunManager
-from ...streaming.sse_manager import SSERegistry
+from ...runner.run_manager import RunManager, RunCapacityError
+from ...streaming.sse_manager import SSERegistry, create_redis_response, create_replay_response
 from ...streaming.event_store import get_event_store
+from ...streaming.run_cache import get_cached_run, cache_run, render_run_detail
 
 runs_bp = Blueprint('runs', __name__)
 
+# SSE 注册表单例，导入时绑定一次
+_sse_registry = SSERegistry.get_instance()
+
+# 流式事件地址（固定，所有运行共用，通过请求体中的 id 区分）
+_STREAM_URL = '/api/executor/v1/runs/stream'
+
+# 请求模型的 TypeAdapter，导入时构建一次，请求时直接从原始字节校验
+_START_ADAPTER = TypeAdapter(RunStartRequest)
+_LIST_ADAPTER = TypeAdapter(RunListRequest)
+_ID_ADAPTER = TypeAdapter(RunIdRequest)
+_STREAM_ADAPTER = TypeAdapter(RunStreamRequest)
+_CANCEL_ADAPTER = TypeAdapter(RunCancelRequest)
+_EVENTS_ADAPTER = TypeAdapter(EventQueryRequest)
+
+# 固定的错误响应体，导入时序列化一次
+_NOT_FOUND_BODY = dumps({'success': False, 'error': '运行记录不存在'})
+_EVENTS_NOT_FOUND_BODY = dumps({'success': False, 'code': 'RUN_NOT_FOUND', 'error': '运行记录不存在'})
+_EVENTS_EXPIRED_BODY = dumps({'success': False, 'code': 'RUN_EXPIRED', 'error': '运行事件已过期或不存在'})
+_EVENTS_UNAVAILABLE_BODY = dumps({'success': False, 'code': 'EVENTS_UNAVAILABLE', 'error': '事件存储暂不可用，请稍后重试'})
+
 
 def get_repo():
-    """获取运行记录仓库"""
-    # 确保使用新的会话，能看到其他线程提交的数据
-    if db:
-        db.remove()  # 清理当前线程的会话
-    session = get_db_session()
-    return RunRepository(session)
+    """
+    获取运行记录仓库
+
+    会话按请求作用域复用，由 teardown_appcontext 在请求结束时统一清理，
+    每个请求开始时都是新会话，能看到其他线程已提交的数据。
+    底层连接来自引擎连接池（见 init_db），会话清理只是把连接归还连接池，
+    处理函数中的单次短查询无需承担建连开销。
+    """
+    return RunRepository(get_db_session())
+
+
+def _is_run_finished(run_id: int) -> bool:
+    """
+    查询运行是否已结束（已是终态或记录已删除）
+
+    由跨进程 SSE 事件流在请求处理函数返回后调用，使用独立 session 并立即关闭，
+    不依赖请求上下文的 session 回收。
+    """
+    session = create_new_session()
+    try:
+        status = RunRepository(session).get_status(run_id)
+    finally:
+        session.close()
+    return status is None or status in TERMINAL_STATUSES
+
+
+def _event_to_dict(event) -> dict:
+    """转换为响应格式（事件由服务端写入 Redis Stream，数据可信，不做 Pydantic 校验）"""
+    return {
+        'id': event.id,
+        'run_id': event.run_id,
+        'timestamp': event.timestamp,
+        'sequence': event.sequence,
+        'source': event.source,
+        'event': event.event,
+        'data': event.data
+    }
 
 
-def get_run_manager():
-    """获取运行管理器"""
+def _stream_events(run_id: int, batches, limit: Optional[int]):
+    """
+    逐批序列化事件并输出 JSON 响应体
+
+    响应结构与一次性构建时一致：count / has_more / next_id 放在 events 之后，
+    读取完毕后再写出。响应头已发出后读取失败时，以 has_more=true、next_id=最后一条事件 ID
+    结束响应，客户端可从该位置继续读取，不会把不完整的结果当作全部事件。
+
+    Args:
+        run_id: 运行 ID
+        batches: EventStore.iter_event_batches() 返回的批次迭代器
+        limit: 最大返回数量（读取时多取一条用于判断 has_more）
+    """
+    yield b'{"success":true,"data":{"run_id":' + dumps(run_id) + b',"events":['
+
+    count = 0
+    has_more = False
+    last_id = None
+    try:
+        for batch in batches:
+            if limit and count + len(batch) > limit:
+                batch = batch[:limit - count]
+                has_more = True
+            if batch:
+                chunk = b','.join(dumps(_event_to_dict(e)) for e in batch)
+                yield chunk if count == 0 else b',' + chunk
+                count += len(batch)
+                last_id = batch[-1].id
+            if has_more:
+                break
+    except redis.RedisError:
+        # 结果不完整：标记还有更多数据，客户端从最后一条已输出的事件继续读取
+        has_more = last_id is not None
+
+    yield b'],' + dumps({
+        'count': count,
+        'has_more': has_more,
+        # 获取下一页起始 ID
+        'next_id': last_id if has_more else None
+    })[1:] + b'}'
+
+
+@functools.cache
+def get_run_manager() -> RunManager:
+    """获取运行管理器（首次调用时创建线程池，之后直接返回绑定的单例）"""
     return RunManager.get_instance()
 
 
-@runs_bp.route('/start', methods=['POST'])
-@swag_from({
+_START_SPEC = {
     'tags': ['Runs'],
     'summary': '启动运行',
     'description': '启动新的层级团队执行任务，返回运行 ID 和流式 URL',
@@ -73,40 +174,37 @@ def get_run_manager():
             }
         },
         400: {'description': '请求无效'},
-        404: {'description': '层级团队不存在'}
+        404: {'description': '层级团队不存在'},
+        503: {'description': '运行数已达上限，请稍后重试'}
     }
-})
-def start_run():
-    """启动运行"""
-    try:
-        data = request.get_json() or {}
-        req = RunStartRequest(**data)
-
-        manager = get_run_manager()
-        run = manager.start_run(req.hierarchy_id, req.task)
-
-        return jsonify({
-            'success': True,
-            'message': '运行已启动',
-            'data': {
-                'id': run.id,
-                'hierarchy_id': run.hierarchy_id,
-                'task': run.task,
-                'status': run.status,
-                'stream_url': f'/api/executor/v1/runs/stream',
-                'created_at': run.created_at.isoformat() if run.created_at else None
-            }
-        })
-    except ValueError as e:
-        return jsonify({'success': False, 'error': str(e)}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+}
 
 
-@runs_bp.route('/list', methods=['POST'])
-@swag_from({
+@runs_bp.route('/start', methods=['POST'])
+@swag_from(_START_SPEC)
+@json_endpoint(_START_ADAPTER, errors={ValueError: 404, RunCapacityError: 503})
+def start_run(req: RunStartRequest):
+    """启动运行"""
+    manager = get_run_manager()
+    run = manager.start_run(req.hierarchy_id, req.task)
+
+    # 刚写入的数据库记录可信，model_construct 跳过字段校验
+    data = RunStartResponse.model_construct(
+        id=run.id,
+        hierarchy_id=run.hierarchy_id,
+        task=run.task,
+        status=run.status,
+        stream_url=_STREAM_URL,
+        created_at=run.created_at
+    )
+    return json_response({
+        'success': True,
+        'message': '运行已启动',
+        'data': data.model_dump(mode='json')
+    })
+
+
+_LIST_SPEC = {
     'tags': ['Runs'],
     'summary': '获取运行列表',
     'description': '分页获取任务运行记录列表，支持按层级团队和状态筛选',
@@ -162,35 +260,36 @@ def start_run():
             }
         }
     }
-})
-def list_runs():
+}
+
+
+@runs_bp.route('/list', methods=['POST'])
+@swag_from(_LIST_SPEC)
+@json_endpoint(_LIST_ADAPTER)
+def list_runs(req: RunListRequest):
     """获取运行列表"""
-    try:
-        data = request.get_json() or {}
-        req = RunListRequest(**data)
-
-        repo = get_repo()
-        runs, total = repo.list(
-            page=req.page,
-            size=req.size,
-            hierarchy_id=req.hierarchy_id,
-            status=req.status
-        )
-
-        return jsonify(build_page_response(
-            content=[r.to_dict() for r in runs],
-            page=req.page,
-            size=req.size,
-            total=total
-        ))
-    except ValidationError as e:
-        return jsonify({'code': 400, 'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'code': 500, 'success': False, 'error': str(e)}), 500
-
-
-@runs_bp.route('/get', methods=['POST'])
-@swag_from({
+    # 未知状态不会匹配任何运行，直接返回空页，无需查询数据库
+    if req.status and req.status not in RUN_STATUSES:
+        return json_response(build_page_response(content=[], page=req.page, size=req.size, total=0))
+
+    repo = get_repo()
+    runs, total = repo.list(
+        page=req.page,
+        size=req.size,
+        hierarchy_id=req.hierarchy_id,
+        status=req.status
+    )
+
+    # 仓库层已返回普通 dict，直接序列化，不经过 Pydantic 响应模型校验
+    return json_response(build_page_response(
+        content=runs,
+        page=req.page,
+        size=req.size,
+        total=total
+    ))
+
+
+_GET_SPEC = {
     'tags': ['Runs'],
     'summary': '获取运行详情',
     'description': '根据运行 ID 获取运行的详细信息，包括任务描述、状态、结果和执行统计',
@@ -234,35 +333,39 @@ def list_runs():
         },
         404: {'description': '运行不存在'}
     }
-})
-def get_run():
+}
+
+
+def get_run(req: RunIdRequest):
     """获取运行详情"""
-    try:
-        data = request.get_json() or {}
-        req = RunIdRequest(**data)
+    # 已结束的运行不再变化，优先从 Redis 读取缓存的响应
+    cached = get_cached_run(req.id)
+    if cached:
+        return bytes_response(cached)
 
-        repo = get_repo()
-        run = repo.get_by_id(req.id)
+    repo = get_repo()
+    run = repo.get_by_id(req.id)
 
-        if not run:
-            return jsonify({'success': False, 'error': '运行记录不存在'}), 404
+    if not run:
+        return bytes_response(_NOT_FOUND_BODY, 404)
 
-        return jsonify({
-            'success': True,
-            'data': run.to_dict()
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    body = render_run_detail(run)
+    # 终态运行不再变化，详情可缓存（只在缓存不存在时写入，执行线程结束时会以最终详情覆盖）
+    if run.status in TERMINAL_STATUSES:
+        cache_run(req.id, body)
+    return bytes_response(body)
 
 
-@runs_bp.route('/stream', methods=['POST'])
-@swag_from({
+_STREAM_SPEC = {
     'tags': ['Runs'],
     'summary': '流式获取运行事件',
     'description': '''通过 SSE (Server-Sent Events) 流式获取运行执行过程中的事件。
 
+浏览器 `EventSource` 无法发送请求体，可使用 `GET /stream?id={运行 ID}` 建立连接。
+
+运行已结束时：携带 `Last-Event-ID` 重连会补发该 ID 之后的剩余事件并以 `close` 事件结束；
+未携带时返回 400。
+
 ## 事件格式
 
 每个事件遵循以下结构:
@@ -354,65 +457,82 @@ data: {"run_id": "...", "timestamp": "...", "sequence": 123, "source": {...}, "e
                 }
             }
         },
-        404: {'description': '运行不存在或已结束'}
+        400: {'description': '运行已结束（未携带 Last-Event-ID）'},
+        404: {'description': '运行不存在'}
     }
-})
-def stream_run():
-    """流式获取运行事件"""
-    try:
-        data = request.get_json() or {}
-        req = RunStreamRequest(**data)
-
-        registry = SSERegistry.get_instance()
-        sse_manager = registry.get(req.id)
-
-        # 获取 Last-Event-ID 头（用于断线重连）
-        last_event_id = request.headers.get('Last-Event-ID')
+}
 
-        # 调试日志
-        print(f"[stream] 请求 run_id: {req.id}", flush=True)
-        print(f"[stream] Last-Event-ID: {last_event_id}", flush=True)
-        print(f"[stream] SSE Registry ID: {id(registry)}", flush=True)
-        print(f"[stream] 已注册的 run_ids: {registry.get_all_run_ids()}", flush=True)
-        print(f"[stream] SSE Manager 存在: {sse_manager is not None}", flush=True)
 
-        if not sse_manager:
+@runs_bp.route('/stream', methods=['GET', 'POST'])
+@swag_from(_STREAM_SPEC)
+@json_endpoint()
+def stream_run():
+    """流式获取运行事件"""
+    if request.method == 'GET':
+        # EventSource 通过查询参数传入运行 ID，无需解析 JSON 和模型校验
+        try:
+            run_id = int(request.args.get('id', ''))
+        except ValueError:
+            return json_response({'success': False, 'error': '无效的运行 ID'}, 400)
+    else:
+        run_id = _STREAM_ADAPTER.validate_json(request.get_data() or b'{}').id
+
+    registry = _sse_registry
+    sse_manager = registry.get(run_id)
+
+    # 获取 Last-Event-ID 头（用于断线重连）
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id and not is_stream_id(last_event_id):
+        return json_response({'success': False, 'error': '无效的 Last-Event-ID'}, 400)
+
+    # 调试日志
+    print(f"[stream] 请求 run_id: {run_id}", flush=True)
+    print(f"[stream] Last-Event-ID: {last_event_id}", flush=True)
+    print(f"[stream] SSE Registry ID: {id(registry)}", flush=True)
+    print(f"[stream] 已注册的 run_ids: {registry.get_all_run_ids()}", flush=True)
+    print(f"[stream] SSE Manager 存在: {sse_manager is not None}", flush=True)
+
+    if not sse_manager:
+        # 刚结束的运行由注册表保留终态，断线重连无需查询数据库
+        status = registry.recently_closed(run_id)
+        if not status:
             # 检查运行是否存在
             repo = get_repo()
-            run = repo.get_by_id(req.id)
+            run = repo.get_by_id(run_id)
 
             if not run:
-                return jsonify({'success': False, 'error': '运行记录不存在'}), 404
-
-            if run.status in ('completed', 'failed', 'cancelled'):
-                return jsonify({
-                    'success': False,
-                    'error': f'运行已结束，状态: {run.status}'
-                }), 400
-
-            return jsonify({
-                'success': False,
-                'error': '运行流不可用，可能尚未开始或已结束'
-            }), 404
-
-        # 如果有 Last-Event-ID，从 Redis 恢复历史事件
-        initial_events = None
+                return bytes_response(_NOT_FOUND_BODY, 404)
+
+            if run.status not in TERMINAL_STATUSES:
+                # 运行由其他 worker 进程执行，通过 Redis Stream 订阅其事件
+                return create_redis_response(
+                    run_id,
+                    last_event_id=last_event_id,
+                    is_run_finished=functools.partial(_is_run_finished, run_id)
+                )
+            status = run.status
+
+        # 运行已结束：断线重连（如消费过慢被断开）时补发剩余事件，避免丢失结尾事件
         if last_event_id:
-            event_store = get_event_store()
-            initial_events = event_store.get_events_after(req.id, last_event_id)
-            print(f"[stream] 恢复历史事件数量: {len(initial_events)}", flush=True)
+            return create_replay_response(run_id, last_event_id)
 
-        # 返回 SSE 响应（带历史事件恢复）
-        return sse_manager.create_response(initial_events=initial_events)
+        return json_response({
+            'success': False,
+            'error': f'运行已结束，状态: {status}'
+        }, 400)
 
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # 如果有 Last-Event-ID，从 Redis 恢复历史事件
+    initial_events = None
+    if last_event_id:
+        event_store = get_event_store()
+        initial_events = event_store.get_events_after(run_id, last_event_id, raw_data=True)
+        print(f"[stream] 恢复历史事件数量: {len(initial_events)}", flush=True)
+
+    # 返回 SSE 响应（带历史事件恢复）
+    return sse_manager.create_response(initial_events=initial_events)
 
 
-@runs_bp.route('/cancel', methods=['POST'])
-@swag_from({
+_CANCEL_SPEC = {
     'tags': ['Runs'],
     'summary': '取消运行',
     'description': '''取消正在执行的运行任务。
@@ -477,50 +597,35 @@ def stream_run():
             }
         }
     }
-})
-def cancel_run():
-    """取消运行"""
-    try:
-        data = request.get_json() or {}
-        req = RunCancelRequest(**data)
+}
 
-        # 检查运行是否存在
-        repo = get_repo()
+
+def cancel_run(req: RunCancelRequest):
+    """取消运行"""
+    # 单条条件 UPDATE 完成存在性检查、状态检查和状态变更
+    repo = get_repo()
+    if not repo.try_cancel(req.id):
+        # 取消失败时再查询一次，区分运行不存在和状态不允许取消
         run = repo.get_by_id(req.id)
 
         if not run:
-            return jsonify({'success': False, 'error': '运行记录不存在'}), 404
-
-        if run.status not in ('pending', 'running'):
-            return jsonify({
-                'success': False,
-                'error': f'运行状态为 {run.status}，无法取消'
-            }), 400
-
-        manager = get_run_manager()
-        success = manager.cancel_run(req.id)
-
-        if success:
-            return jsonify({
-                'success': True,
-                'message': '运行已取消'
-            })
-        else:
-            # 直接更新状态（可能运行管理器中没有此运行）
-            repo.update_status(req.id, 'cancelled')
-            return jsonify({
-                'success': True,
-                'message': '运行已取消'
-            })
-
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-
-@runs_bp.route('/events', methods=['POST'])
-@swag_from({
+            return bytes_response(_NOT_FOUND_BODY, 404)
+
+        return json_response({
+            'success': False,
+            'error': f'运行状态为 {run.status}，无法取消'
+        }, 400)
+
+    # 通知执行线程停止（运行可能不在当前进程中）
+    get_run_manager().cancel_run(req.id)
+
+    return json_response({
+        'success': True,
+        'message': '运行已取消'
+    })
+
+
+_EVENTS_SPEC = {
     'tags': ['Runs'],
     'summary': '获取运行事件列表',
     'description': '''获取运行的历史事件记录（从 Redis Stream 读取）。
@@ -615,94 +720,76 @@ def cancel_run():
             }
         },
         404: {'description': '运行不存在'},
-        410: {'description': '运行事件已过期'}
+        410: {'description': '运行事件已过期'},
+        503: {'description': '事件存储暂不可用，请稍后重试'}
     }
-})
-def get_run_events():
-    """获取运行事件列表（从 Redis Stream）"""
-    try:
-        data = request.get_json() or {}
-        req = EventQueryRequest(**data)
+}
 
-        # 检查运行是否存在
-        repo = get_repo()
-        run = repo.get_by_id(req.id)
 
-        if not run:
-            return jsonify({
-                'success': False,
-                'code': 'RUN_NOT_FOUND',
-                'error': '运行记录不存在'
-            }), 404
+def get_run_events(req: EventQueryRequest):
+    """获取运行事件列表（从 Redis Stream）"""
+    # 检查运行是否存在
+    repo = get_repo()
+    run = repo.get_by_id(req.id)
 
-        # 从 Redis Stream 获取事件
-        event_store = get_event_store()
+    if not run:
+        return bytes_response(_EVENTS_NOT_FOUND_BODY, 404)
 
-        # 检查 Stream 是否存在
-        if not event_store.exists(req.id):
-            # Stream 不存在，可能已过期或从未产生事件
-            if run.status in ('completed', 'failed', 'cancelled'):
-                return jsonify({
-                    'success': False,
-                    'code': 'RUN_EXPIRED',
-                    'error': '运行事件已过期或不存在'
-                }), 410
-
-            # 运行尚未产生事件
-            return jsonify({
-                'success': True,
-                'data': {
-                    'run_id': req.id,
-                    'events': [],
-                    'count': 0,
-                    'has_more': False,
-                    'next_id': None
-                }
-            })
-
-        # 获取事件（多取一条用于判断 has_more）
-        fetch_count = req.limit + 1 if req.limit else None
-        events = event_store.get_events(
-            run_id=req.id,
-            start_id=req.start_id,
-            end_id=req.end_id,
-            count=fetch_count
-        )
-
-        # 判断是否有更多数据
-        has_more = len(events) > req.limit if req.limit else False
-        if has_more:
-            events = events[:req.limit]
+    # 从 Redis Stream 获取事件
+    event_store = get_event_store()
 
-        # 获取下一页起始 ID
-        next_id = events[-1].id if has_more and events else None
-
-        # 转换为响应格式
-        event_list = [
-            {
-                'id': e.id,
-                'run_id': e.run_id,
-                'timestamp': e.timestamp,
-                'sequence': e.sequence,
-                'source': e.source,
-                'event': e.event,
-                'data': e.data
-            }
-            for e in events
-        ]
+    # 检查 Stream 是否存在
+    if not event_store.exists(req.id):
+        # Stream 不存在，可能已过期或从未产生事件
+        if run.status in TERMINAL_STATUSES:
+            return bytes_response(_EVENTS_EXPIRED_BODY, 410)
 
-        return jsonify({
+        # 运行尚未产生事件
+        return json_response({
             'success': True,
             'data': {
                 'run_id': req.id,
-                'events': event_list,
-                'count': len(event_list),
-                'has_more': has_more,
-                'next_id': next_id
+                'events': [],
+                'count': 0,
+                'has_more': False,
+                'next_id': None
             }
         })
 
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # 分批读取并流式输出事件，长运行的事件历史无需一次性加载到内存
+    # 多取一条用于判断 has_more
+    fetch_count = req.limit + 1 if req.limit else None
+    batches = event_store.iter_event_batches(
+        run_id=req.id,
+        start_id=req.start_id,
+        end_id=req.end_id,
+        count=fetch_count,
+        raw_data=True
+    )
+    # 第一批在发出响应头之前读取，读取失败时仍可返回错误状态码
+    try:
+        first_batch = next(batches, [])
+    except redis.RedisError:
+        return bytes_response(_EVENTS_UNAVAILABLE_BODY, 503)
+
+    return Response(
+        _stream_events(req.id, itertools.chain((first_batch,), batches), req.limit),
+        mimetype='application/json'
+    )
+
+
+# 以运行 ID 为主键的 POST 接口：请求结构在导入时已知，统一由 json_endpoint
+# 校验请求体后分发到各自的实现，按表注册路由
+_ID_ROUTES = (
+    ('/get', get_run, _GET_SPEC, _ID_ADAPTER),
+    ('/cancel', cancel_run, _CANCEL_SPEC, _CANCEL_ADAPTER),
+    ('/events', get_run_events, _EVENTS_SPEC, _EVENTS_ADAPTER),
+)
+
+for _rule, _impl, _spec, _adapter in _ID_ROUTES:
+    runs_bp.add_url_rule(
+        _rule,
+        endpoint=_impl.__name__,
+        view_func=swag_from(_spec)(json_endpoint(_adapter)(_impl)),
+        methods=['POST']
+    )
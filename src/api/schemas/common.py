@@ -2,11 +2,21 @@
 Common Schemas - 通用请求/响应模型
 """
 
+import re
 from typing import Optional, List, Any, Generic, TypeVar
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 T = TypeVar('T')
 
+# 请求模型通用配置：校验后只读，跳过实例重复校验，去除字符串首尾空白
+# 网关会向请求体注入额外字段（tenantId / traceId 等），因此未知字段保持忽略而非拒绝
+REQUEST_MODEL_CONFIG = ConfigDict(
+    frozen=True,
+    revalidate_instances='never',
+    str_strip_whitespace=True,
+    extra='ignore',
+)
+
 
 class LLMConfig(BaseModel):
     """LLM 配置 - 统一的模型参数对象，适用于 Global Supervisor、Team Supervisor 和 Worker"""
@@ -25,8 +35,39 @@ class PaginationRequest(BaseModel):
     userId: Optional[str] = Field(default=None, description="用户ID（网关注入）")
 
 
+# 资源 ID（UUID 字符串）匹配器，导入时编译一次；数据库排序规则不区分大小写，匹配同样忽略大小写
+_RESOURCE_ID_MATCH = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.IGNORECASE
+).fullmatch
+
+
+def is_resource_id(value: str) -> bool:
+    """
+    判断是否为合法的资源 ID（UUID 字符串）
+
+    格式不合法的 ID 不可能对应任何记录，路由可直接返回 404 而无需查询数据库。
+    """
+    return _RESOURCE_ID_MATCH(value) is not None
+
+
+# Redis Stream 消息 ID（<毫秒时间戳>-<序号>，序号可省略）
+STREAM_ID_PATTERN = r'\d+(?:-\d+)?'
+
+# 事件范围查询边界：'-' / '+' 或消息 ID（可带 '(' 前缀表示不包含该 ID）
+STREAM_RANGE_PATTERN = rf'^(?:[-+]|\(?{STREAM_ID_PATTERN})$'
+
+_STREAM_ID_MATCH = re.compile(STREAM_ID_PATTERN).fullmatch
+
+
+def is_stream_id(value: str) -> bool:
+    """判断是否为合法的 Redis Stream 消息 ID（如断线重连携带的 Last-Event-ID）"""
+    return _STREAM_ID_MATCH(value) is not None
+
+
 class IdRequest(BaseModel):
     """ID 请求 (字符串类型)"""
+    model_config = REQUEST_MODEL_CONFIG
+
     id: str = Field(..., description="资源 ID")
 
 
@@ -46,7 +87,13 @@ class PaginatedResponse(BaseModel, Generic[T]):
     last: bool = Field(description="是否为最后一页")
 
 
-def build_page_response(content: list, page: int, size: int, total: int) -> dict:
+def build_page_response(
+    content: list,
+    page: int,
+    size: int,
+    total: int,
+    next_cursor: Optional[str] = None
+) -> dict:
     """
     构建符合宪法分页协议的响应
 
@@ -55,25 +102,29 @@ def build_page_response(content: list, page: int, size: int, total: int) -> dict
         page: 当前页码（从 1 开始）
         size: 每页大小
         total: 总记录数
+        next_cursor: 下一页游标（支持游标分页的接口使用，没有下一页时不返回）
 
     Returns:
         符合宪法的分页响应字典
     """
     import math
     total_pages = math.ceil(total / size) if size > 0 else 0
+    data = {
+        'content': content,
+        'page': page,
+        'size': size,
+        'totalElements': total,
+        'totalPages': total_pages,
+        'first': page == 1,
+        'last': page >= total_pages
+    }
+    if next_cursor is not None:
+        data['nextCursor'] = next_cursor
     return {
         'code': 0,
         'message': 'success',
         'success': True,
-        'data': {
-            'content': content,
-            'page': page,
-            'size': size,
-            'totalElements': total,
-            'totalPages': total_pages,
-            'first': page == 1,
-            'last': page >= total_pages
-        }
+        'data': data
     }
 
 
@@ -5,11 +5,13 @@ Model Schemas - AI 模型请求/响应模型
 from typing import Optional, List
 from pydantic import BaseModel, Field
 
-from .common import PaginationRequest
+from .common import PaginationRequest, REQUEST_MODEL_CONFIG
 
 
 class ModelCreateRequest(BaseModel):
     """创建模型请求"""
+    model_config = REQUEST_MODEL_CONFIG
+
     name: str = Field(..., min_length=1, max_length=100, description="模型名称")
     model_id: str = Field(..., min_length=1, max_length=200, description="AWS Bedrock 模型 ID")
     region: str = Field(default="us-east-1", description="AWS 区域")
@@ -22,6 +24,8 @@ class ModelCreateRequest(BaseModel):
 
 class ModelUpdateRequest(BaseModel):
     """更新模型请求"""
+    model_config = REQUEST_MODEL_CONFIG
+
     id: str = Field(..., description="模型 ID")
     name: Optional[str] = Field(default=None, min_length=1, max_length=100)
     model_id: Optional[str] = Field(default=None, min_length=1, max_length=200)
@@ -35,7 +39,18 @@ class ModelUpdateRequest(BaseModel):
 
 class ModelListRequest(PaginationRequest):
     """模型列表请求"""
+    model_config = REQUEST_MODEL_CONFIG
+
     is_active: Optional[bool] = Field(default=None, description="过滤激活状态")
+    cursor: Optional[str] = Field(
+        default=None,
+        description="游标（上一页返回的 nextCursor），传入时使用游标分页并忽略 page"
+    )
+    ids: Optional[List[str]] = Field(
+        default=None,
+        max_length=100,
+        description="按模型 ID 批量查询，单次 IN 查询代替逐个调用 /get"
+    )
 
 
 class ModelResponse(BaseModel):
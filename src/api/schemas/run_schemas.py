@@ -2,10 +2,11 @@
 Run Schemas - 运行记录请求/响应模型
 """
 
+from datetime import datetime
 from typing import Optional, List, Any
 from pydantic import BaseModel, Field
 
-from .common import PaginationRequest
+from .common import PaginationRequest, STREAM_RANGE_PATTERN
 
 
 class RunStartRequest(BaseModel):
@@ -44,7 +45,12 @@ class EventResponse(BaseModel):
 
 
 class RunResponse(BaseModel):
-    """运行记录响应"""
+    """
+    运行记录响应
+
+    数据库数据可信，如需由数据库行构建响应模型，使用 model_construct() 跳过字段校验，
+    而非 model_validate()。
+    """
     id: int
     hierarchy_id: str
     task: str
@@ -67,20 +73,20 @@ class RunDetailResponse(RunResponse):
 
 
 class RunStartResponse(BaseModel):
-    """启动运行响应"""
+    """启动运行响应（created_at 由 pydantic-core 序列化为 ISO 8601）"""
     id: int
     hierarchy_id: str
     task: str
     status: str
     stream_url: str
-    created_at: Optional[str]
+    created_at: Optional[datetime]
 
 
 class EventQueryRequest(BaseModel):
     """历史事件查询请求"""
     id: int = Field(..., description="运行 ID")
-    start_id: Optional[str] = Field(default='-', description="起始 ID，'-' 表示最早")
-    end_id: Optional[str] = Field(default='+', description="结束 ID，'+' 表示最新")
+    start_id: Optional[str] = Field(default='-', pattern=STREAM_RANGE_PATTERN, description="起始 ID，'-' 表示最早")
+    end_id: Optional[str] = Field(default='+', pattern=STREAM_RANGE_PATTERN, description="结束 ID，'+' 表示最新")
     limit: Optional[int] = Field(default=1000, ge=1, le=10000, description="最大返回数量")
 
 
@@ -223,15 +223,10 @@ class HierarchyExecutor:
         Returns:
             事件列表
         """
+        # 拓扑创建事件已在执行前由 event_capture 记录，这里不再重复生成（合并时排在首位）
         events = []
-
-        # 添加拓扑创建事件
-        events.append(InternalEvent(
-            event_type=EventType.TOPOLOGY_CREATED,
-            timestamp=datetime.now().isoformat(),
-            data={'topology': self.topology_info.to_dict()},
-            topology_metadata=None
-        ))
+        # 本批事件在同一时刻生成，时间戳只格式化一次
+        now = datetime.now().isoformat()
 
         # 从调用历史创建事件
         for call in tracker.call_history:
@@ -263,7 +258,7 @@ class HierarchyExecutor:
             if call['status'] == 'completed':
                 events.append(InternalEvent(
                     event_type=EventType.TEAM_COMPLETED,
-                    timestamp=call.get('end_time', datetime.now().isoformat()),
+                    timestamp=call.get('end_time', now),
                     data={
                         'team_name': call['team_name'],
                         'result_preview': call.get('result', '')[:200]
@@ -293,7 +288,7 @@ class HierarchyExecutor:
 
             events.append(InternalEvent(
                 event_type=EventType.WORKER_COMPLETED,
-                timestamp=datetime.now().isoformat(),
+                timestamp=now,
                 data={
                     'worker_name': worker_name,
                     'result_preview': result[:200] if result else ''
@@ -361,8 +356,13 @@ class HierarchyExecutor:
             # 8. 获取统计信息
             statistics = tracker.get_statistics() if tracker else None
             
-            # 9. 合并所有事件
-            all_events = execution_events + self.event_capture.get_events()
+            # 9. 合并所有事件：拓扑创建事件在首位，随后是执行事件和其余捕获的事件
+            captured_events = self.event_capture.get_events()
+            all_events = [
+                event for event in captured_events if event.event_type == EventType.TOPOLOGY_CREATED
+            ] + execution_events + [
+                event for event in captured_events if event.event_type != EventType.TOPOLOGY_CREATED
+            ]
             
             # 10. 返回响应
             return ExecutionResponse(
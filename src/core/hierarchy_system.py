@@ -14,8 +14,10 @@
 
 import hashlib
 import re
+import threading
 import types
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Callable, Set
 from dataclasses import dataclass, field
@@ -229,6 +231,10 @@ class CallTracker:
         """初始化调用追踪器"""
         # 调用历史记录列表
         self.call_history: List[Dict[str, Any]] = []
+        # 调用 ID 到调用记录的索引（与 call_history 共享同一记录对象）
+        self._calls_by_id: Dict[str, Dict[str, Any]] = {}
+        # 已完成调用数，在 end_call 时维护，统计时无需遍历历史记录
+        self.completed_calls = 0
         # 每个团队的调用次数
         self.team_calls: Dict[str, int] = {}
         # 当前正在执行的团队集合
@@ -253,13 +259,15 @@ class CallTracker:
         call_id = f"{team_name}_{len(self.call_history)}"
         
         # 记录调用信息
-        self.call_history.append({
+        call = {
             'call_id': call_id,
             'team_name': team_name,
             'task': task,
             'start_time': datetime.now().isoformat(),
             'status': 'in_progress'
-        })
+        }
+        self.call_history.append(call)
+        self._calls_by_id[call_id] = call
         
         # 更新调用次数
         self.team_calls[team_name] = self.team_calls.get(team_name, 0) + 1
@@ -278,19 +286,20 @@ class CallTracker:
             call_id: 调用 ID
             result: 执行结果
         """
-        # 查找对应的调用记录
-        for call in self.call_history:
-            if call['call_id'] == call_id:
-                # 更新调用记录
-                call['end_time'] = datetime.now().isoformat()
-                call['result'] = result
-                call['status'] = 'completed'
-                
-                # 从活跃团队中移除
-                team_name = call['team_name']
-                if team_name in self.active_teams:
-                    self.active_teams.remove(team_name)
-                break
+        # 按索引查找对应的调用记录
+        call = self._calls_by_id.get(call_id)
+        if call is None:
+            return
+
+        # 更新调用记录
+        if call['status'] != 'completed':
+            self.completed_calls += 1
+        call['end_time'] = datetime.now().isoformat()
+        call['result'] = result
+        call['status'] = 'completed'
+
+        # 从活跃团队中移除
+        self.active_teams.discard(call['team_name'])
     
     def is_team_active(self, team_name: str) -> bool:
         """
@@ -327,7 +336,7 @@ class CallTracker:
             'total_calls': len(self.call_history),
             'team_calls': self.team_calls.copy(),
             'active_teams': list(self.active_teams),
-            'completed_calls': sum(1 for c in self.call_history if c['status'] == 'completed')
+            'completed_calls': self.completed_calls
         }
     
     def get_call_log(self) -> str:
@@ -408,6 +417,10 @@ class GlobalConfig:
 # Worker Agent 工厂
 # ============================================================================
 
+# Worker 调用追踪器最多保留的记录数（进程级共享，超出时淘汰最早的记录）
+_WORKER_CALL_TRACKER_MAXSIZE = 1024
+
+
 class WorkerAgentFactory:
     """
     Worker Agent 工厂 - 动态创建 Worker Agent
@@ -415,8 +428,10 @@ class WorkerAgentFactory:
     负责创建 Worker Agent 实例，并管理 Worker 的调用追踪和防重复机制。
     """
 
-    # 类级别的调用追踪器（记录任务哈希 -> 结果）
-    _worker_call_tracker = {}
+    # 类级别的调用追踪器（记录任务哈希 -> 结果），按写入顺序限制容量，服务长时间运行时内存不会持续增长
+    _worker_call_tracker: 'OrderedDict[str, str]' = OrderedDict()
+    # 多个运行线程共享调用追踪器，读写均需持有该锁
+    _worker_call_lock = threading.Lock()
     # 类级别的执行追踪器引用
     _execution_tracker: Optional['ExecutionTracker'] = None
     # 类级别的 run_id（用于跨线程回调查找）
@@ -474,7 +489,9 @@ class WorkerAgentFactory:
         call_key = f"{config.name}_{task_hash}"
         
         # 检查是否已处理过相同任务
-        if call_key in WorkerAgentFactory._worker_call_tracker:
+        with WorkerAgentFactory._worker_call_lock:
+            is_duplicate = call_key in WorkerAgentFactory._worker_call_tracker
+        if is_duplicate:
             OutputFormatter.print_worker_duplicate_task_warning(config.name)
             return OutputFormatter.format_duplicate_task_message(config.name)
         return call_key
@@ -548,7 +565,12 @@ class WorkerAgentFactory:
         result = OutputFormatter.format_result_message(config.name, response_text)
 
         # 记录执行结果
-        WorkerAgentFactory._worker_call_tracker[call_key] = result
+        call_tracker = WorkerAgentFactory._worker_call_tracker
+        with WorkerAgentFactory._worker_call_lock:
+            call_tracker[call_key] = result
+            call_tracker.move_to_end(call_key)
+            if len(call_tracker) > _WORKER_CALL_TRACKER_MAXSIZE:
+                call_tracker.popitem(last=False)
         if WorkerAgentFactory._execution_tracker:
             WorkerAgentFactory._execution_tracker.mark_worker_executed(config.name, result)
 
@@ -608,13 +630,82 @@ class WorkerAgentFactory:
     @staticmethod
     def reset_tracker():
         """重置调用追踪器，清空所有调用记录"""
-        WorkerAgentFactory._worker_call_tracker.clear()
+        with WorkerAgentFactory._worker_call_lock:
+            WorkerAgentFactory._worker_call_tracker.clear()
 
 
 # ============================================================================
 # Team Supervisor 工厂
 # ============================================================================
 
+# Team Supervisor 执行规则模板（导入时构建一次，每次调用只填充团队相关字段）
+_TEAM_SUPERVISOR_RULES = """
+================================================================================
+CRITICAL INSTRUCTIONS FOR TEAM SUPERVISOR - STRICT SEQUENTIAL EXECUTION
+================================================================================
+
+You are the TEAM SUPERVISOR of [{team_name}].
+Your ONLY job is to delegate tasks to your team members (workers).
+
+[ABSOLUTE RULES - VIOLATION IS FORBIDDEN]
+
+1. You must NEVER answer questions directly. NO EXCEPTIONS.
+2. You must ALWAYS call worker tools to handle the task.
+3. Each worker can ONLY be called ONCE.
+4. You MUST call EVERY worker ({num_workers} total).
+
+[YOUR TEAM MEMBERS]
+{worker_list}
+
+================================================================================
+⛔⛔⛔ STRICT SINGLE TOOL CALL RULE ⛔⛔⛔
+================================================================================
+
+**ABSOLUTE REQUIREMENT: You can ONLY call ONE tool per response!**
+
+After calling a tool, you MUST:
+1. STOP generating any more content
+2. WAIT for the tool result to come back
+3. Only AFTER receiving the result, continue with next action
+
+❌ FORBIDDEN: Calling multiple tools in one response
+❌ FORBIDDEN: Continuing to write after a tool call
+❌ FORBIDDEN: Planning next steps before seeing tool result
+
+✅ CORRECT: Call ONE tool → STOP → Wait for result → Then respond again
+
+================================================================================
+MANDATORY WORKFLOW - ONE TOOL CALL THEN STOP
+================================================================================
+
+**Each response should follow this pattern:**
+
+[Team: {team_name} | Supervisor] THINKING: <brief analysis>
+[Team: {team_name} | Supervisor] SELECT: <worker name>
+<call the worker tool>
+<STOP HERE - DO NOT WRITE ANYTHING ELSE>
+
+**After receiving the tool result, in your NEXT response:**
+- Analyze the result
+- If more workers needed: repeat the pattern above
+- If all workers done: output SUMMARY
+
+================================================================================
+EXECUTION STATUS
+================================================================================
+- Workers marked ⭕ = NOT executed yet (you MUST call these)
+- Workers marked ✅ = Already completed (do NOT call again)
+
+================================================================================
+FAILURE CONDITIONS
+================================================================================
+- ❌ Calling multiple tools in one response
+- ❌ Writing content after a tool call (must STOP immediately)
+- ❌ Skipping any worker marked ⭕
+- ❌ Answering directly without calling workers
+"""
+
+
 class TeamSupervisorFactory:
     """Team Supervisor 工厂 - 动态创建 Team Supervisor"""
     
@@ -733,71 +824,9 @@ class TeamSupervisorFactory:
         num_workers = len(worker_names)
 
         # 添加执行规则 - 严格单工具调用限制
-        enhanced_task_parts.append(f"""
-================================================================================
-CRITICAL INSTRUCTIONS FOR TEAM SUPERVISOR - STRICT SEQUENTIAL EXECUTION
-================================================================================
-
-You are the TEAM SUPERVISOR of [{team_name}].
-Your ONLY job is to delegate tasks to your team members (workers).
-
-[ABSOLUTE RULES - VIOLATION IS FORBIDDEN]
-
-1. You must NEVER answer questions directly. NO EXCEPTIONS.
-2. You must ALWAYS call worker tools to handle the task.
-3. Each worker can ONLY be called ONCE.
-4. You MUST call EVERY worker ({num_workers} total).
-
-[YOUR TEAM MEMBERS]
-{worker_list}
-
-================================================================================
-⛔⛔⛔ STRICT SINGLE TOOL CALL RULE ⛔⛔⛔
-================================================================================
-
-**ABSOLUTE REQUIREMENT: You can ONLY call ONE tool per response!**
-
-After calling a tool, you MUST:
-1. STOP generating any more content
-2. WAIT for the tool result to come back
-3. Only AFTER receiving the result, continue with next action
-
-❌ FORBIDDEN: Calling multiple tools in one response
-❌ FORBIDDEN: Continuing to write after a tool call
-❌ FORBIDDEN: Planning next steps before seeing tool result
-
-✅ CORRECT: Call ONE tool → STOP → Wait for result → Then respond again
-
-================================================================================
-MANDATORY WORKFLOW - ONE TOOL CALL THEN STOP
-================================================================================
-
-**Each response should follow this pattern:**
-
-[Team: {team_name} | Supervisor] THINKING: <brief analysis>
-[Team: {team_name} | Supervisor] SELECT: <worker name>
-<call the worker tool>
-<STOP HERE - DO NOT WRITE ANYTHING ELSE>
-
-**After receiving the tool result, in your NEXT response:**
-- Analyze the result
-- If more workers needed: repeat the pattern above
-- If all workers done: output SUMMARY
-
-================================================================================
-EXECUTION STATUS
-================================================================================
-- Workers marked ⭕ = NOT executed yet (you MUST call these)
-- Workers marked ✅ = Already completed (do NOT call again)
-
-================================================================================
-FAILURE CONDITIONS
-================================================================================
-- ❌ Calling multiple tools in one response
-- ❌ Writing content after a tool call (must STOP immediately)
-- ❌ Skipping any worker marked ⭕
-- ❌ Answering directly without calling workers
-""")
+        enhanced_task_parts.append(_TEAM_SUPERVISOR_RULES.format(
+            team_name=team_name, num_workers=num_workers, worker_list=worker_list
+        ))
         
         return "\n".join(enhanced_task_parts)
     
@@ -8,7 +8,10 @@ from .database import db, init_db, get_db_session
 from .models import (
     HierarchyTeam,
     ExecutionRun,
-    RunStatus
+    RunStatus,
+    RUN_STATUSES,
+    CANCELLABLE_STATUSES,
+    TERMINAL_STATUSES
 )
 
 __all__ = [
@@ -18,4 +21,7 @@ __all__ = [
     'HierarchyTeam',
     'ExecutionRun',
     'RunStatus',
+    'RUN_STATUSES',
+    'CANCELLABLE_STATUSES',
+    'TERMINAL_STATUSES',
 ]
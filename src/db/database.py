@@ -3,6 +3,7 @@ Database Connection - 数据库连接管理
 """
 
 import os
+import threading
 from contextlib import contextmanager
 from typing import Generator
 
@@ -16,6 +17,9 @@ _engine = None
 _SessionFactory = None
 db = None
 
+# 延迟初始化锁：并发的首次调用只执行一次 init_db，避免重复创建引擎和连接池
+_init_lock = threading.Lock()
+
 
 def get_database_url() -> str:
     """
@@ -68,11 +72,13 @@ def init_db(app=None, database_url: str = None):
     else:
         url = get_database_url()
 
-    # 创建引擎
+    # 创建引擎（连接池在请求间复用连接；pool_recycle 早于 MySQL wait_timeout 回收空闲连接，
+    # pool_pre_ping 在取出连接时探测失效连接）
     _engine = create_engine(
         url,
         pool_size=10,
         max_overflow=20,
+        pool_recycle=1800,
         pool_pre_ping=True,
         echo=os.environ.get('DB_ECHO', 'false').lower() == 'true'
     )
@@ -87,11 +93,17 @@ def init_db(app=None, database_url: str = None):
     return db
 
 
+def _ensure_initialized():
+    """确保数据库已初始化（双重检查，初始化完成后只有一次判断）"""
+    if db is None:
+        with _init_lock:
+            if db is None:
+                init_db()
+
+
 def get_engine():
     """获取数据库引擎"""
-    global _engine
-    if _engine is None:
-        init_db()
+    _ensure_initialized()
     return _engine
 
 
@@ -102,9 +114,7 @@ def get_db_session() -> Session:
     Returns:
         SQLAlchemy Session 实例
     """
-    global db, _SessionFactory
-    if db is None:
-        init_db()
+    _ensure_initialized()
     return db()
 
 
@@ -118,9 +128,7 @@ def create_new_session() -> Session:
     Returns:
         新的 SQLAlchemy Session 实例
     """
-    global _SessionFactory
-    if _SessionFactory is None:
-        init_db()
+    _ensure_initialized()
     return _SessionFactory()
 
 
@@ -30,6 +30,18 @@ class RunStatus(str, Enum):
     CANCELLED = 'cancelled'
 
 
+# 全部运行状态值
+RUN_STATUSES = frozenset(status.value for status in RunStatus)
+
+# 可取消的运行状态
+CANCELLABLE_STATUSES = frozenset({RunStatus.PENDING.value, RunStatus.RUNNING.value})
+
+# 终态：运行结束后不再变化
+TERMINAL_STATUSES = frozenset({
+    RunStatus.COMPLETED.value, RunStatus.FAILED.value, RunStatus.CANCELLED.value
+})
+
+
 class AIModel(Base):
     """AI 模型配置"""
     __tablename__ = 'ai_model'
@@ -43,6 +55,8 @@ class AIModel(Base):
     top_p = Column(Float, default=0.9, comment='Top-P 参数')
     description = Column(Text, nullable=True, comment='模型描述')
     is_active = Column(Boolean, default=True, comment='是否激活')
+    # 版本号，每次更新在数据库端自增（updated_at 只精确到秒，不能用于判断内容是否变化）
+    version = Column(Integer, nullable=False, default=1, server_default='1', comment='版本号')
 
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -60,8 +74,9 @@ class AIModel(Base):
             'top_p': self.top_p,
             'description': self.description,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            # datetime 交由 orjson 原生序列化为 ISO 8601
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
 
 
@@ -93,13 +108,15 @@ class HierarchyTeam(Base):
             'config': self.config,
             'is_active': self.is_active,
             'version': self.version,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            # datetime 交由 orjson 原生序列化为 ISO 8601
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
 
     def to_execution_config(self) -> dict:
         """转换为执行配置格式"""
-        return self.config
+        # 调用方只会补充顶层字段（task、run_id），浅拷贝即可避免改动 ORM 跟踪的 JSON 值，嵌套结构只读共享
+        return dict(self.config)
 
 
 class ExecutionRun(Base):
@@ -137,9 +154,10 @@ class ExecutionRun(Base):
             'error': self.error,
             'statistics': self.statistics,
             'topology_snapshot': self.topology_snapshot,
-            'started_at': self.started_at.isoformat() if self.started_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            # datetime 交由 orjson 原生序列化为 ISO 8601
+            'started_at': self.started_at,
+            'completed_at': self.completed_at,
+            'created_at': self.created_at,
         }
 
 
@@ -4,6 +4,8 @@ Hierarchy Repository - 层级团队数据访问层
 
 import uuid
 from typing import List, Optional, Tuple
+from sqlalchemy import select, func, update, delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..models import HierarchyTeam
@@ -89,6 +91,8 @@ class HierarchyRepository:
         """
         创建层级团队
 
+        名称唯一性由数据库唯一索引保证，冲突时回滚并抛出 IntegrityError。
+
         Args:
             name: 层级团队名称
             description: 描述
@@ -103,7 +107,11 @@ class HierarchyRepository:
             config=config
         )
         self.session.add(hierarchy)
-        self.session.commit()
+        try:
+            self.session.commit()
+        except IntegrityError:
+            self.session.rollback()
+            raise
         self.session.refresh(hierarchy)
         return hierarchy
 
@@ -113,6 +121,16 @@ class HierarchyRepository:
             .filter(HierarchyTeam.id == hierarchy_id) \
             .first()
 
+    def get_version(self, hierarchy_id: str) -> Optional[Tuple[int]]:
+        """
+        获取层级团队版本（仅查询 version 列，每次更新在数据库端自增）
+
+        Returns:
+            (version,) 行；层级团队不存在时返回 None
+        """
+        stmt = select(HierarchyTeam.version).where(HierarchyTeam.id == hierarchy_id)
+        return self.session.execute(stmt).first()
+
     def get_by_name(self, name: str) -> Optional[HierarchyTeam]:
         """根据名称获取层级团队"""
         return self.session.query(HierarchyTeam) \
@@ -128,61 +146,76 @@ class HierarchyRepository:
         """
         获取层级团队列表
 
+        总数通过窗口函数 COUNT(*) OVER () 随分页查询一并返回，一次往返完成；
+        页码超出范围（本页无数据）时才单独执行 COUNT。
+
         Returns:
             (层级列表, 总数)
         """
-        query = self.session.query(HierarchyTeam)
-
+        conditions = []
         if is_active is not None:
-            query = query.filter(HierarchyTeam.is_active == is_active)
+            conditions.append(HierarchyTeam.is_active == is_active)
 
-        total = query.count()
-        hierarchies = query.order_by(HierarchyTeam.created_at.desc()) \
-                          .offset((page - 1) * size) \
-                          .limit(size) \
-                          .all()
+        stmt = select(HierarchyTeam, func.count().over().label('total')) \
+            .where(*conditions) \
+            .order_by(HierarchyTeam.created_at.desc()) \
+            .offset((page - 1) * size) \
+            .limit(size)
+        rows = self.session.execute(stmt).all()
 
-        return hierarchies, total
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+
+        total = self.session.execute(
+            select(func.count()).select_from(HierarchyTeam).where(*conditions)
+        ).scalar_one()
+        return [], total
 
     def update(self, hierarchy_id: str, data: dict) -> Optional[HierarchyTeam]:
         """
         更新层级团队
 
+        单条 UPDATE 语句完成更新（版本号在数据库端自增），以受影响行数判断是否存在，
+        无需先查询。名称唯一性由数据库唯一索引保证，冲突时回滚并抛出 IntegrityError。
+
         Args:
             hierarchy_id: 层级团队 ID
             data: 更新数据，可包含 name, description, config, is_active
         """
-        hierarchy = self.get_by_id(hierarchy_id)
-        if not hierarchy:
-            return None
+        # 更新版本号
+        values = {'version': HierarchyTeam.version + 1}
 
         # 更新字段
-        if 'name' in data:
-            hierarchy.name = data['name']
-        if 'description' in data:
-            hierarchy.description = data['description']
+        for key in ('name', 'description', 'is_active'):
+            if key in data:
+                values[key] = data[key]
         if 'config' in data:
             # 确保所有 Agent 都有 agent_id
-            hierarchy.config = ensure_agent_ids(data['config'])
-        if 'is_active' in data:
-            hierarchy.is_active = data['is_active']
-
-        # 更新版本号
-        hierarchy.version += 1
-
-        self.session.commit()
-        self.session.refresh(hierarchy)
-        return hierarchy
+            values['config'] = ensure_agent_ids(data['config'])
+
+        stmt = update(HierarchyTeam) \
+            .where(HierarchyTeam.id == hierarchy_id) \
+            .values(**values) \
+            .execution_options(synchronize_session=False)
+        try:
+            result = self.session.execute(stmt)
+            self.session.commit()
+        except IntegrityError:
+            self.session.rollback()
+            raise
+
+        if result.rowcount == 0:
+            return None
+        return self.session.get(HierarchyTeam, hierarchy_id, populate_existing=True)
 
     def delete(self, hierarchy_id: str) -> bool:
-        """删除层级团队"""
-        hierarchy = self.get_by_id(hierarchy_id)
-        if not hierarchy:
-            return False
-
-        self.session.delete(hierarchy)
+        """删除层级团队（单条 DELETE，以受影响行数判断是否存在）"""
+        stmt = delete(HierarchyTeam) \
+            .where(HierarchyTeam.id == hierarchy_id) \
+            .execution_options(synchronize_session=False)
+        result = self.session.execute(stmt)
         self.session.commit()
-        return True
+        return result.rowcount > 0
 
     def exists(self, hierarchy_id: str) -> bool:
         """检查层级团队是否存在"""
@@ -2,11 +2,61 @@
 Model Repository - AI 模型数据访问层
 """
 
-from typing import List, Optional
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, raiseload
 
 from ..models import AIModel
 
+# 列表接口投影的列（不含 description 大字段）
+SUMMARY_COLUMNS = (
+    AIModel.id,
+    AIModel.name,
+    AIModel.model_id,
+    AIModel.region,
+    AIModel.temperature,
+    AIModel.max_tokens,
+    AIModel.top_p,
+    AIModel.is_active,
+    AIModel.created_at,
+    AIModel.updated_at,
+)
+
+# 允许通过 update() 修改的列
+UPDATABLE_COLUMNS = frozenset(AIModel.__table__.columns.keys()) - {'id', 'created_at', 'version'}
+
+# 摘要行的固定键序列，构建行字典时直接 zip，避免逐行的 RowMapping 包装
+SUMMARY_KEYS = tuple(column.key for column in SUMMARY_COLUMNS)
+
+
+def encode_cursor(created_at: datetime, model_id: str) -> str:
+    """将 (created_at, id) 编码为分页游标"""
+    raw = f"{created_at.isoformat()}|{model_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+@lru_cache(maxsize=1024)
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    解码分页游标
+
+    结果为不可变的 (datetime, str)，按游标字符串缓存：客户端重复请求同一页
+    （如携带 If-None-Match 的重新验证）时无需再次 base64 解码和解析时间。
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, model_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), model_id
+    except (ValueError, UnicodeError):
+        raise ValueError(f"无效的分页游标: {cursor}")
+
 
 class ModelRepository:
     """AI 模型仓库"""
@@ -15,10 +65,18 @@ class ModelRepository:
         self.session = session
 
     def create(self, data: dict) -> AIModel:
-        """创建模型"""
+        """
+        创建模型
+
+        名称唯一性由数据库唯一索引保证，冲突时回滚并抛出 IntegrityError。
+        """
         model = AIModel(**data)
         self.session.add(model)
-        self.session.commit()
+        try:
+            self.session.commit()
+        except IntegrityError:
+            self.session.rollback()
+            raise
         self.session.refresh(model)
         return model
 
@@ -26,6 +84,16 @@ class ModelRepository:
         """根据 ID 获取模型"""
         return self.session.query(AIModel).filter(AIModel.id == model_id).first()
 
+    def get_version(self, model_id: str) -> Optional[Tuple[int]]:
+        """
+        获取模型版本（仅查询 version 列，每次更新在数据库端自增）
+
+        Returns:
+            (version,) 行；模型不存在时返回 None
+        """
+        stmt = select(AIModel.version).where(AIModel.id == model_id)
+        return self.session.execute(stmt).first()
+
     def get_by_name(self, name: str) -> Optional[AIModel]:
         """根据名称获取模型"""
         return self.session.query(AIModel).filter(AIModel.name == name).first()
@@ -42,7 +110,9 @@ class ModelRepository:
         Returns:
             (模型列表, 总数)
         """
-        query = self.session.query(AIModel)
+        # 禁止序列化时的隐式懒加载，避免列表出现 N+1 查询；
+        # 确需关联数据时应显式使用 selectinload
+        query = self.session.query(AIModel).options(raiseload('*'))
 
         if is_active is not None:
             query = query.filter(AIModel.is_active == is_active)
@@ -55,29 +125,116 @@ class ModelRepository:
 
         return models, total
 
-    def update(self, model_id: str, data: dict) -> Optional[AIModel]:
-        """更新模型"""
-        model = self.get_by_id(model_id)
-        if not model:
-            return None
+    def list_summary(
+        self,
+        page: int = 1,
+        size: int = 20,
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        total: Optional[int] = None,
+        ids: Optional[List[str]] = None
+    ) -> tuple[List[dict], int, Optional[str]]:
+        """
+        获取模型摘要列表
 
-        for key, value in data.items():
-            if hasattr(model, key) and key not in ('id', 'created_at'):
-                setattr(model, key, value)
+        只查询列表所需的列，按固定键序列直接构建普通 dict，
+        跳过 ORM 对象构建和 to_dict()，orjson 可直接序列化无需回退处理。
+        传入 cursor 时使用 (created_at, id) 游标分页，耗时与翻页深度无关；
+        否则使用 LIMIT/OFFSET。两种模式都会多取一行来生成下一页游标。
+        调用方已知总数（如命中缓存）时传入 total，可跳过 COUNT 查询。
+        传入 ids 时通过单条 IN 查询批量获取指定模型。
 
-        self.session.commit()
-        self.session.refresh(model)
-        return model
+        Returns:
+            (模型摘要列表, 总数, 下一页游标)
+        """
+        stmt = select(*SUMMARY_COLUMNS)
+        if is_active is not None:
+            stmt = stmt.where(AIModel.is_active == is_active)
+        if ids is not None:
+            stmt = stmt.where(AIModel.id.in_(ids))
+
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                tuple_(AIModel.created_at, AIModel.id) < (cursor_created_at, cursor_id)
+            )
+        else:
+            stmt = stmt.offset((page - 1) * size)
+
+        stmt = stmt.order_by(AIModel.created_at.desc(), AIModel.id.desc()) \
+                   .limit(size + 1)
+
+        rows = [dict(zip(SUMMARY_KEYS, row)) for row in self.session.execute(stmt)]
+
+        next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+        if total is None:
+            total = self.count(is_active, ids)
+
+        return rows, total, next_cursor
+
+    def count(self, is_active: Optional[bool] = None, ids: Optional[List[str]] = None) -> int:
+        """统计模型数量（不带 ORDER BY，便于数据库走索引计数）"""
+        stmt = select(func.count()).select_from(AIModel)
+        if is_active is not None:
+            stmt = stmt.where(AIModel.is_active == is_active)
+        if ids is not None:
+            stmt = stmt.where(AIModel.id.in_(ids))
+        return self.session.execute(stmt).scalar_one()
+
+    def update(self, model_id: str, data: dict) -> Optional[AIModel]:
+        """
+        更新模型
+
+        使用单条 UPDATE 语句完成更新（版本号在数据库端自增），无需先查询。数据库支持 RETURNING 时
+        （PostgreSQL / SQLite / MariaDB）在同一次往返中取回更新后的行，
+        否则（MySQL）以受影响行数判断是否存在，再按主键读取一次。
+        名称唯一性由数据库唯一索引保证，冲突时回滚并抛出 IntegrityError。
+        """
+        values = {key: value for key, value in data.items() if key in UPDATABLE_COLUMNS}
+        if not values:
+            return self.get_by_id(model_id)
+        values['version'] = AIModel.version + 1
+
+        stmt = update(AIModel).where(AIModel.id == model_id).values(**values)
+
+        try:
+            if self.session.get_bind().dialect.update_returning:
+                model = self.session.execute(
+                    stmt.returning(AIModel),
+                    execution_options={'populate_existing': True}
+                ).scalar_one_or_none()
+                # 脱离 session，避免提交后属性过期再触发一次 SELECT
+                if model is not None:
+                    self.session.expunge(model)
+                self.session.commit()
+                return model
+
+            result = self.session.execute(stmt.execution_options(synchronize_session=False))
+            self.session.commit()
+        except IntegrityError:
+            self.session.rollback()
+            raise
+
+        if result.rowcount == 0:
+            return None
+        return self.session.get(AIModel, model_id, populate_existing=True)
 
     def delete(self, model_id: str) -> bool:
-        """删除模型"""
-        model = self.get_by_id(model_id)
-        if not model:
-            return False
+        """
+        删除模型
 
-        self.session.delete(model)
+        单条 DELETE 语句完成删除，以受影响行数判断模型是否存在，无需先查询。
+        """
+        stmt = delete(AIModel) \
+            .where(AIModel.id == model_id) \
+            .execution_options(synchronize_session=False)
+        result = self.session.execute(stmt)
         self.session.commit()
-        return True
+        return result.rowcount > 0
 
     def exists(self, model_id: str) -> bool:
         """检查模型是否存在"""
@@ -6,9 +6,14 @@ import time
 from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select, func, update, delete
 
-from ..models import ExecutionRun, RunStatus
+from ..models import ExecutionRun, RunStatus, CANCELLABLE_STATUSES, TERMINAL_STATUSES
+
+# 列表查询的列及其键序列（与 ExecutionRun.to_dict() 的键一致），
+# 按列投影查询后直接 zip 成 dict，跳过 ORM 对象构建和 to_dict()
+LIST_COLUMNS = tuple(ExecutionRun.__table__.columns)
+LIST_KEYS = tuple(column.key for column in LIST_COLUMNS)
 
 
 class RunRepository:
@@ -29,49 +34,101 @@ class RunRepository:
         """根据 ID 获取运行记录"""
         return self.session.query(ExecutionRun).filter(ExecutionRun.id == run_id).first()
 
+    def get_status(self, run_id: int) -> Optional[str]:
+        """获取运行状态（仅查询 status 列），运行不存在时返回 None"""
+        stmt = select(ExecutionRun.status).where(ExecutionRun.id == run_id)
+        return self.session.execute(stmt).scalar_one_or_none()
+
     def list(
         self,
         page: int = 1,
         size: int = 20,
         hierarchy_id: Optional[str] = None,
         status: Optional[str] = None
-    ) -> tuple[List[ExecutionRun], int]:
+    ) -> tuple[List[dict], int]:
         """
         获取运行记录列表
 
+        按列投影查询，每行以固定键序列直接构建普通 dict，不构建 ORM 对象。
+        总数通过窗口函数 COUNT(*) OVER () 随分页查询一并返回，一次往返完成；
+        页码超出范围（本页无数据）时才单独执行 COUNT。
+
         Returns:
             (运行列表, 总数)
         """
-        query = self.session.query(ExecutionRun)
-
+        conditions = []
         if hierarchy_id:
-            query = query.filter(ExecutionRun.hierarchy_id == hierarchy_id)
+            conditions.append(ExecutionRun.hierarchy_id == hierarchy_id)
         if status:
-            query = query.filter(ExecutionRun.status == status)
+            conditions.append(ExecutionRun.status == status)
+
+        stmt = select(*LIST_COLUMNS, func.count().over().label('total')) \
+            .where(*conditions) \
+            .order_by(ExecutionRun.created_at.desc()) \
+            .offset((page - 1) * size) \
+            .limit(size)
+        rows = self.session.execute(stmt).all()
+
+        if rows:
+            return [dict(zip(LIST_KEYS, row)) for row in rows], rows[0].total
 
-        total = query.count()
-        runs = query.order_by(ExecutionRun.created_at.desc()) \
-                   .offset((page - 1) * size) \
-                   .limit(size) \
-                   .all()
+        total = self.session.execute(
+            select(func.count()).select_from(ExecutionRun).where(*conditions)
+        ).scalar_one()
+        return [], total
 
-        return runs, total
+    def _update(self, run_id: int, values: dict) -> bool:
+        """
+        单条 UPDATE 语句更新运行记录
+
+        以受影响行数判断记录是否存在，无需先查询。
+        """
+        stmt = update(ExecutionRun) \
+            .where(ExecutionRun.id == run_id) \
+            .values(**values) \
+            .execution_options(synchronize_session=False)
+        result = self.session.execute(stmt)
+        self.session.commit()
+        return result.rowcount > 0
 
-    def update_status(self, run_id: int, status: str) -> bool:
-        """更新运行状态"""
-        run = self.get_by_id(run_id)
-        if not run:
-            return False
+    def update_status(self, run_id: int, status: str, at: Optional[datetime] = None) -> bool:
+        """
+        更新运行状态
 
-        run.status = status
+        Args:
+            run_id: 运行 ID
+            status: 新状态
+            at: 状态变更时间（UTC，可选），调用方需要复用同一时间戳时传入
+        """
+        values = {'status': status}
+        at = at or datetime.utcnow()
 
         if status == RunStatus.RUNNING.value:
-            run.started_at = datetime.utcnow()
-        elif status in (RunStatus.COMPLETED.value, RunStatus.FAILED.value, RunStatus.CANCELLED.value):
-            run.completed_at = datetime.utcnow()
+            values['started_at'] = at
+        elif status in TERMINAL_STATUSES:
+            values['completed_at'] = at
 
+        return self._update(run_id, values)
+
+    def try_cancel(self, run_id: int) -> bool:
+        """
+        原子地取消运行
+
+        单条条件 UPDATE 完成状态检查和状态变更，仅 pending / running 状态的运行会被取消。
+
+        Returns:
+            是否取消成功（运行不存在或已结束时返回 False）
+        """
+        stmt = update(ExecutionRun) \
+            .where(
+                ExecutionRun.id == run_id,
+                ExecutionRun.status.in_(CANCELLABLE_STATUSES)
+            ) \
+            .values(status=RunStatus.CANCELLED.value, completed_at=datetime.utcnow()) \
+            .execution_options(synchronize_session=False)
+        result = self.session.execute(stmt)
         self.session.commit()
-        return True
+        return result.rowcount > 0
 
     def update_result(
         self,
@@ -82,22 +139,16 @@ class RunRepository:
         statistics: dict = None
     ) -> bool:
         """更新运行结果"""
-        run = self.get_by_id(run_id)
-        if not run:
-            return False
-
-        run.status = status
-        run.completed_at = datetime.utcnow()
+        values = {'status': status, 'completed_at': datetime.utcnow()}
 
         if result is not None:
-            run.result = result
+            values['result'] = result
         if error is not None:
-            run.error = error
+            values['error'] = error
         if statistics is not None:
-            run.statistics = statistics
+            values['statistics'] = statistics
 
-        self.session.commit()
-        return True
+        return self._update(run_id, values)
 
     # NOTE: add_event() and get_events() methods removed in favor of Redis Stream (EventStore)
     # See src/streaming/event_store.py for the new event storage implementation.
@@ -105,25 +156,17 @@ class RunRepository:
 
     def set_topology_snapshot(self, run_id: int, topology: dict) -> bool:
         """设置拓扑快照"""
-        run = self.get_by_id(run_id)
-        if not run:
-            return False
-
-        run.topology_snapshot = topology
-        self.session.commit()
-        return True
+        return self._update(run_id, {'topology_snapshot': topology})
 
     def delete(self, run_id: int) -> bool:
-        """删除运行记录"""
-        run = self.get_by_id(run_id)
-        if not run:
-            return False
-
+        """删除运行记录（单条 DELETE，以受影响行数判断记录是否存在）"""
         # NOTE: Events are now stored in Redis Stream, not MySQL.
         # Redis Stream events will auto-expire after 24 hours (TTL set on run completion).
         # For immediate cleanup, use EventStore.delete(run_id)
 
-        # 删除运行记录
-        self.session.delete(run)
+        stmt = delete(ExecutionRun) \
+            .where(ExecutionRun.id == run_id) \
+            .execution_options(synchronize_session=False)
+        result = self.session.execute(stmt)
         self.session.commit()
-        return True
+        return result.rowcount > 0
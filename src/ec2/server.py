@@ -112,6 +112,8 @@ from ..db.database import init_db
 
 # 导入路由蓝图
 from ..api.routes import models_bp, hierarchies_bp, runs_bp, health_bp
+from ..api.responses import OrJSONProvider, bytes_response
+from ..api.cache import cache
 
 
 def create_app(config_name: str = None) -> Flask:
@@ -126,16 +128,27 @@ def create_app(config_name: str = None) -> Flask:
     """
     app = Flask(__name__)
 
+    # 使用 orjson 解析请求体 / 序列化响应
+    app.json = OrJSONProvider(app)
+
     # 加载配置
     app.config['DATABASE_URL'] = os.environ.get('DATABASE_URL')
     app.config['DEBUG'] = os.environ.get('DEBUG', 'false').lower() == 'true'
 
+    # 响应缓存（默认进程内 SimpleCache，可通过 CACHE_TYPE=RedisCache 切换为共享缓存）
+    cache.init_app(app, config={
+        'CACHE_TYPE': os.environ.get('CACHE_TYPE', 'SimpleCache'),
+        'CACHE_REDIS_URL': os.environ.get('CACHE_REDIS_URL'),
+        'CACHE_DEFAULT_TIMEOUT': 300,
+    })
+
     # 配置 CORS
     CORS(
         app,
         origins='*',
         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-        allow_headers=['Content-Type', 'Authorization']
+        allow_headers=['Content-Type', 'Authorization', 'If-None-Match'],
+        expose_headers=['ETag']
     )
 
     # 配置 Swagger - 内部使用，仅用于收集路由文档
@@ -213,22 +226,25 @@ Authorization: Bearer <token>
 
     swagger = Swagger(app, config=swagger_config, template=swagger_template)
 
+    # 路由注册完成后文档不再变化，首次生成后缓存序列化结果
+    openapi_cache = {}
+
     # 添加纯 OpenAPI 3.0 端点
     @app.route('/v3/api-docs', methods=['GET'])
     def openapi_docs():
         """返回纯 OpenAPI 3.0 格式的 API 文档"""
-        import requests
-        from ..core.config import Config
+        body = openapi_cache.get('body')
+        if body is not None:
+            return bytes_response(body)
 
-        # 从内部 Swagger 端点获取生成的 spec
+        # 直接在进程内生成 Swagger spec，无需请求自身的 /swagger-internal.json
+        cacheable = True
         try:
-            # 直接从内部端点获取 spec（使用配置中的固定端口）
-            internal_url = f"http://127.0.0.1:{Config.SERVER_PORT}/swagger-internal.json"
-            resp = requests.get(internal_url, timeout=5)
-            spec = resp.json()
+            spec = swagger.get_apispecs('apispec_internal')
         except Exception:
-            # 如果获取失败，使用空 paths
+            # 如果生成失败，使用空 paths（不缓存，下次请求重试）
             spec = {"paths": {}, "tags": swagger_template.get("tags", [])}
+            cacheable = False
 
         # 转换为 OpenAPI 3.0 格式
         openapi_spec = {
@@ -282,7 +298,10 @@ Authorization: Bearer <token>
             "security": [{"Bearer Authentication": []}]
         }
 
-        return jsonify(openapi_spec)
+        body = app.json.dumps(openapi_spec).encode()
+        if cacheable:
+            openapi_cache['body'] = body
+        return bytes_response(body)
 
     # 初始化数据库
     db = init_db(app)
@@ -4,6 +4,7 @@ Run Manager - 运行管理器
 管理任务执行生命周期，支持流式输出和取消
 """
 
+import os
 import threading
 import traceback
 from datetime import datetime
@@ -22,12 +23,24 @@ from ..streaming.llm_callback import (
     clear_current_run_id
 )
 from ..streaming.event_store import get_event_store
+from ..streaming.run_cache import run_cache_key, render_run_detail, RUN_CACHE_TTL_SECONDS
 from ..core.api_models import EventCategory, EventAction
 
 # 延迟导入 - 避免在模块加载时触发 strands 依赖
 # from ..core.hierarchy_executor import execute_hierarchy
 
 
+# 同时执行的运行数（线程池大小）
+MAX_CONCURRENT_RUNS = int(os.environ.get('MAX_CONCURRENT_RUNS', '10'))
+
+# 单个进程内未结束（排队 + 执行中）运行数上限，超出时拒绝新运行，避免线程池队列无限堆积
+MAX_ACTIVE_RUNS = int(os.environ.get('MAX_ACTIVE_RUNS', '50'))
+
+
+class RunCapacityError(RuntimeError):
+    """未结束的运行数已达上限"""
+
+
 def _get_execute_hierarchy():
     """延迟获取 execute_hierarchy 函数"""
     from ..core.hierarchy_executor import execute_hierarchy
@@ -49,21 +62,31 @@ class RunManager:
         return cls._instance
 
     def __init__(self):
+        # 双重检查：并发的首次调用只有一个线程执行初始化，避免重复创建线程池
         if self._initialized:
             return
+        with self._lock:
+            if self._initialized:
+                return
 
-        self.sse_registry = SSERegistry.get_instance()
-        self.executor = ThreadPoolExecutor(max_workers=10)
+            self.sse_registry = SSERegistry.get_instance()
+            self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_RUNS)
+            self._run_slots = threading.BoundedSemaphore(MAX_ACTIVE_RUNS)
 
-        # 活跃运行追踪
-        self._active_runs: Dict[int, dict] = {}
-        self._cancellation_flags: Dict[int, threading.Event] = {}
-        self._run_lock = threading.Lock()
-        self._initialized = True
+            # 活跃运行追踪
+            self._active_runs: Dict[int, dict] = {}
+            self._cancellation_flags: Dict[int, threading.Event] = {}
+            self._run_lock = threading.Lock()
+
+            # 所有属性就绪后再置位
+            self._initialized = True
 
     @classmethod
     def get_instance(cls) -> 'RunManager':
-        """获取单例实例"""
+        """获取单例实例（初始化完成后直接返回，不再经过 __new__/__init__）"""
+        instance = cls._instance
+        if instance is not None and instance._initialized:
+            return instance
         return cls()
 
     def start_run(self, hierarchy_id: str, task: str) -> ExecutionRun:
@@ -76,76 +99,106 @@ class RunManager:
 
         Returns:
             ExecutionRun 记录
+
+        Raises:
+            ValueError: 层级团队不存在
+            RunCapacityError: 未结束的运行数已达上限
         """
-        session = get_db_session()
-        run_repo = RunRepository(session)
-        hierarchy_repo = HierarchyRepository(session)
-
-        # 检查层级团队是否存在
-        hierarchy = hierarchy_repo.get_by_id(hierarchy_id)
-        if not hierarchy:
-            raise ValueError(f"层级团队不存在: {hierarchy_id}")
-
-        # 创建运行记录
-        run = run_repo.create({
-            'hierarchy_id': hierarchy_id,
-            'task': task,
-            'status': RunStatus.PENDING.value,
-        })
-
-        # 创建取消标志
-        cancel_flag = threading.Event()
-        with self._run_lock:
-            self._cancellation_flags[run.id] = cancel_flag
-            self._active_runs[run.id] = {
-                'status': 'pending',
-                'started_at': None,
-                'hierarchy_id': hierarchy_id
-            }
-
-        # 注册 SSE 管理器
-        sse_manager = self.sse_registry.register(run.id)
-
-        # 调试日志
-        print(f"[start] 创建 run_id: {run.id}", flush=True)
-        print(f"[start] SSE Registry ID: {id(self.sse_registry)}", flush=True)
-        print(f"[start] 已注册的 run_ids: {self.sse_registry.get_all_run_ids()}", flush=True)
-
-        # 获取执行配置
-        config_dict = hierarchy.to_execution_config()
-        config_dict['task'] = task
-
-        # 提交到线程池执行
-        self.executor.submit(
-            self._execute_run,
-            run.id,
-            config_dict,
-            task,
-            sse_manager,
-            cancel_flag
-        )
+        # 占用运行名额，运行结束时在 _execute_run 中释放
+        if not self._run_slots.acquire(blocking=False):
+            raise RunCapacityError(f"运行数已达上限 ({MAX_ACTIVE_RUNS})，请稍后重试")
+
+        try:
+            session = get_db_session()
+            run_repo = RunRepository(session)
+            hierarchy_repo = HierarchyRepository(session)
+
+            # 检查层级团队是否存在
+            hierarchy = hierarchy_repo.get_by_id(hierarchy_id)
+            if not hierarchy:
+                raise ValueError(f"层级团队不存在: {hierarchy_id}")
+
+            # 创建运行记录
+            run = run_repo.create({
+                'hierarchy_id': hierarchy_id,
+                'task': task,
+                'status': RunStatus.PENDING.value,
+            })
+        except Exception:
+            self._run_slots.release()
+            raise
+
+        try:
+            # 创建取消标志
+            cancel_flag = threading.Event()
+            with self._run_lock:
+                self._cancellation_flags[run.id] = cancel_flag
+                self._active_runs[run.id] = {
+                    'status': 'pending',
+                    'started_at': None,
+                    'hierarchy_id': hierarchy_id
+                }
+
+            # 注册 SSE 管理器
+            sse_manager = self.sse_registry.register(run.id)
+
+            # 调试日志
+            print(f"[start] 创建 run_id: {run.id}", flush=True)
+            print(f"[start] SSE Registry ID: {id(self.sse_registry)}", flush=True)
+            print(f"[start] 已注册的 run_ids: {self.sse_registry.get_all_run_ids()}", flush=True)
+
+            # 获取执行配置
+            config_dict = hierarchy.to_execution_config()
+            config_dict['task'] = task
+
+            # 提交到线程池执行
+            self.executor.submit(
+                self._execute_run,
+                run.id,
+                config_dict,
+                task,
+                sse_manager,
+                cancel_flag
+            )
+        except Exception as e:
+            # 未能提交执行：_execute_run 不会运行，在这里清理并释放名额
+            self._abort_start(run_repo, run.id, str(e))
+            raise
 
         return run
 
+    def _abort_start(self, run_repo: RunRepository, run_id: int, error: str):
+        """
+        清理提交执行前失败的运行
+
+        移除内存中的运行状态和 SSE 管理器，将运行记录标记为失败并释放运行名额。
+        """
+        with self._run_lock:
+            self._active_runs.pop(run_id, None)
+            self._cancellation_flags.pop(run_id, None)
+        self.sse_registry.remove(run_id)
+        try:
+            run_repo.update_result(run_id, RunStatus.FAILED.value, error=error)
+        except Exception as e:
+            print(f"[start] 标记运行失败状态异常: {e}", flush=True)
+        finally:
+            self._run_slots.release()
+
     def cancel_run(self, run_id: int) -> bool:
         """
-        取消运行
+        通知执行线程取消运行
+
+        数据库状态由调用方通过 RunRepository.try_cancel() 原子更新，这里只设置取消标志。
 
         Args:
             run_id: 运行 ID
 
         Returns:
-            是否成功取消
+            当前进程中是否存在该运行
         """
         with self._run_lock:
             if run_id in self._cancellation_flags:
                 self._cancellation_flags[run_id].set()
-
-                # 更新状态
-                session = get_db_session()
-                run_repo = RunRepository(session)
-                run_repo.update_status(run_id, RunStatus.CANCELLED.value)
-
                 return True
         return False
 
@@ -178,17 +231,23 @@ class RunManager:
         使用独立的数据库 session，避免与其他线程共享事务状态。
         """
         print(f"[execute] 开始执行 run_id: {run_id}", flush=True)
-        # 创建独立的 session，避免线程间事务污染
-        session = create_new_session()
-        run_repo = RunRepository(session)
+        session = None
+        run_repo = None
+        final_status = RunStatus.FAILED.value
 
         try:
+            # 创建独立的 session，避免线程间事务污染（在 try 内创建，失败时同样执行清理并释放名额）
+            session = create_new_session()
+            run_repo = RunRepository(session)
+
             # 更新状态为 running
             print(f"[execute] 更新状态为 running", flush=True)
-            run_repo.update_status(run_id, RunStatus.RUNNING.value)
+            # 数据库记录与内存状态使用同一个开始时间
+            started_at = datetime.utcnow()
+            run_repo.update_status(run_id, RunStatus.RUNNING.value, at=started_at)
             with self._run_lock:
                 self._active_runs[run_id]['status'] = 'running'
-                self._active_runs[run_id]['started_at'] = datetime.utcnow()
+                self._active_runs[run_id]['started_at'] = started_at
 
             # 发送开始事件
             sse_manager.emit({
@@ -232,6 +291,7 @@ class RunManager:
 
             # 更新结果
             if response.success:
+                final_status = RunStatus.COMPLETED.value
                 run_repo.update_result(
                     run_id,
                     RunStatus.COMPLETED.value,
@@ -266,6 +326,7 @@ class RunManager:
 
         except InterruptedError:
             # 运行被取消
+            final_status = RunStatus.CANCELLED.value
             run_repo.update_status(run_id, RunStatus.CANCELLED.value)
             sse_manager.emit({
                 'source': None,
@@ -283,11 +344,12 @@ class RunManager:
             print(f"[execute] ❌ 执行失败: {error_msg}", flush=True)
             print(f"[execute] 详情: {error_details}", flush=True)
 
-            run_repo.update_result(
-                run_id,
-                RunStatus.FAILED.value,
-                error=f"{error_msg}\n{error_details}"
-            )
+            if run_repo is not None:
+                run_repo.update_result(
+                    run_id,
+                    RunStatus.FAILED.value,
+                    error=f"{error_msg}\n{error_details}"
+                )
             sse_manager.emit({
                 'source': None,
                 'event': {
@@ -305,24 +367,45 @@ class RunManager:
             print(f"[execute] 清理 run_id: {run_id}", flush=True)
 
             # 设置 Redis Stream 过期时间（24 小时后自动删除）
+            # 终态结果已写入（可能覆盖了取消时写入的状态），同一事务中以最终详情覆盖详情缓存，
+            # 取消后读取路径缓存的中间结果不会保留；读取失败时删除缓存，由读取路径重新缓存
             try:
+                cache_key = run_cache_key(run_id)
+                try:
+                    run = run_repo.get_by_id(run_id) if run_repo is not None else None
+                    detail = render_run_detail(run) if run else None
+                except Exception as e:
+                    print(f"[execute] 读取最终运行详情失败: {e}", flush=True)
+                    detail = None
+
                 event_store = get_event_store()
-                event_store.set_expire(run_id, ttl_seconds=86400)
+                if detail:
+                    event_store.set_expire(
+                        run_id, ttl_seconds=86400,
+                        set_keys=((cache_key, detail, RUN_CACHE_TTL_SECONDS),)
+                    )
+                else:
+                    event_store.set_expire(run_id, ttl_seconds=86400, delete_keys=(cache_key,))
                 print(f"[execute] 已设置事件流过期时间: 24小时", flush=True)
             except Exception as e:
                 print(f"[execute] 设置事件流过期时间失败: {e}", flush=True)
 
             # 关闭独立的数据库 session
             try:
-                session.close()
+                if session is not None:
+                    session.close()
             except Exception as e:
                 print(f"[execute] 关闭 session 异常: {e}", flush=True)
 
-            sse_manager.close()
-            with self._run_lock:
-                self._active_runs.pop(run_id, None)
-                self._cancellation_flags.pop(run_id, None)
-            self.sse_registry.remove(run_id)
+            # 运行名额在独立的 finally 中释放，关闭 SSE 或移除注册异常时也不会永久泄漏
+            try:
+                sse_manager.close()
+                with self._run_lock:
+                    self._active_runs.pop(run_id, None)
+                    self._cancellation_flags.pop(run_id, None)
+                self.sse_registry.remove(run_id, status=final_status)
+            finally:
+                self._run_slots.release()
             print(f"[execute] 清理完成，剩余 run_ids: {self.sse_registry.get_all_run_ids()}", flush=True)
 
     def shutdown(self):
@@ -9,12 +9,12 @@ Event Store - Redis Stream 事件存储
 - 自动过期 (EXPIRE)
 """
 
-import json
 import logging
+import time
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 
+import orjson
 import redis
 
 from .redis_client import get_redis_client
@@ -27,10 +27,28 @@ logger = logging.getLogger(__name__)
 STREAM_MAXLEN = 10000  # 单个运行最多保留 10000 条事件
 STREAM_TTL_SECONDS = 86400  # 24 小时后自动删除
 
+# 最近一次格式化的 (秒级时间戳, 日期时间前缀)
+_timestamp_prefix = (-1, '')
 
-@dataclass
+
+def utc_timestamp() -> str:
+    """
+    生成毫秒精度的 ISO 8601 UTC 时间戳（如 2025-01-01T12:00:00.123Z）
+
+    同一秒内的日期时间部分只格式化一次，之后每个事件只拼接毫秒。
+    """
+    global _timestamp_prefix
+    second, millis = divmod(time.time_ns() // 1_000_000, 1000)
+    cached_second, prefix = _timestamp_prefix
+    if second != cached_second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S.', time.gmtime(second))
+        _timestamp_prefix = (second, prefix)
+    return f'{prefix}{millis:03d}Z'
+
+
+@dataclass(slots=True)
 class StreamEvent:
-    """Redis Stream 事件"""
+    """Redis Stream 事件（SSE 输出时由 orjson 直接序列化，字段顺序即事件 JSON 的键顺序）"""
     id: str                          # Redis 消息 ID
     run_id: int                      # 运行 ID
     timestamp: str                   # ISO 8601 时间戳
@@ -96,8 +114,7 @@ class EventStore:
         try:
             # 生成时间戳（毫秒精度）
             if timestamp is None:
-                now = datetime.utcnow()
-                timestamp = now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond // 1000:03d}Z'
+                timestamp = utc_timestamp()
 
             # 构建消息字段
             fields = {
@@ -105,7 +122,8 @@ class EventStore:
                 'sequence': str(sequence) if sequence is not None else '0',
                 'event_category': event_category,
                 'event_action': event_action,
-                'data': json.dumps(data or {}, ensure_ascii=False),
+                # orjson 直接输出 UTF-8 字节串，redis 客户端原样写入，无需 ensure_ascii 及 str 往返
+                'data': orjson.dumps(data or {}, option=orjson.OPT_NON_STR_KEYS),
             }
 
             # 添加来源信息
@@ -166,11 +184,62 @@ class EventStore:
             logger.error(f"Redis read failed for run {run_id}: {e}")
             return []
 
+    def iter_event_batches(
+        self,
+        run_id: int,
+        start_id: str = '-',
+        end_id: str = '+',
+        count: int = None,
+        batch_size: int = 500,
+        raw_data: bool = False
+    ) -> Iterator[List[StreamEvent]]:
+        """
+        分批读取事件
+
+        每批使用一次 XRANGE 读取，调用方可边读边输出，无需一次性加载全部事件。
+
+        Args:
+            run_id: 运行 ID
+            start_id: 起始 ID（包含），'-' 表示最早
+            end_id: 结束 ID（包含），'+' 表示最新
+            count: 最大返回总数，None 表示不限制
+            batch_size: 每批读取数量
+            raw_data: 为 True 时 data 保持为已序列化的 JSON（orjson.Fragment），
+                      直接输出为 JSON 响应时跳过解析和重新序列化
+
+        Yields:
+            事件列表（每批最多 batch_size 条）
+
+        Raises:
+            redis.RedisError: 读取失败（调用方可能已输出部分批次，需自行决定如何告知客户端）
+        """
+        stream_key = self._stream_key(run_id)
+        remaining = count
+        while remaining is None or remaining > 0:
+            fetch = batch_size if remaining is None else min(batch_size, remaining)
+            try:
+                messages = self.redis.xrange(stream_key, start_id, end_id, count=fetch)
+            except redis.RedisError as e:
+                logger.error(f"Redis read failed for run {run_id}: {e}")
+                raise
+            if not messages:
+                return
+
+            yield [self._parse_message(run_id, msg_id, fields, raw_data) for msg_id, fields in messages]
+
+            if len(messages) < fetch:
+                return
+            if remaining is not None:
+                remaining -= len(messages)
+            # 下一批从上一批最后一条之后开始（'(' 前缀表示排除）
+            start_id = f"({messages[-1][0]}"
+
     def get_events_after(
         self,
         run_id: int,
         last_id: str,
-        count: int = None
+        count: int = None,
+        raw_data: bool = False
     ) -> List[StreamEvent]:
         """
         获取指定 ID 之后的事件（不包含 last_id）
@@ -181,6 +250,8 @@ class EventStore:
             run_id: 运行 ID
             last_id: 上次收到的消息 ID
             count: 最大返回数量
+            raw_data: 为 True 时 data 保持为已序列化的 JSON（orjson.Fragment），
+                      仅转发给客户端而不读取 data 时使用，省去解析和重新序列化
 
         Returns:
             事件列表
@@ -190,7 +261,7 @@ class EventStore:
             # 使用 '(' 前缀表示排除起始 ID
             exclusive_start = f"({last_id}"
             messages = self.redis.xrange(stream_key, exclusive_start, '+', count=count)
-            return [self._parse_message(run_id, msg_id, fields) for msg_id, fields in messages]
+            return [self._parse_message(run_id, msg_id, fields, raw_data) for msg_id, fields in messages]
         except redis.RedisError as e:
             logger.error(f"Redis read failed for run {run_id}: {e}")
             return []
@@ -199,7 +270,8 @@ class EventStore:
         self,
         run_id: int,
         last_id: str = '$',
-        block_ms: int = 5000
+        block_ms: int = 5000,
+        raw_data: bool = False
     ) -> List[StreamEvent]:
         """
         订阅新事件（阻塞读取）
@@ -208,6 +280,7 @@ class EventStore:
             run_id: 运行 ID
             last_id: 从此 ID 之后开始读取，'$' 表示只读新消息
             block_ms: 阻塞等待时间（毫秒）
+            raw_data: 为 True 时 data 保持为已序列化的 JSON（orjson.Fragment）
 
         Returns:
             新事件列表（可能为空，表示超时）
@@ -222,7 +295,7 @@ class EventStore:
             events = []
             for stream_name, messages in result:
                 for msg_id, fields in messages:
-                    events.append(self._parse_message(run_id, msg_id, fields))
+                    events.append(self._parse_message(run_id, msg_id, fields, raw_data))
 
             return events
 
@@ -230,20 +303,38 @@ class EventStore:
             logger.error(f"Redis subscribe failed for run {run_id}: {e}")
             return []
 
-    def set_expire(self, run_id: int, ttl_seconds: int = STREAM_TTL_SECONDS) -> bool:
+    def set_expire(
+        self,
+        run_id: int,
+        ttl_seconds: int = STREAM_TTL_SECONDS,
+        delete_keys: Tuple[str, ...] = (),
+        set_keys: Tuple[Tuple[str, bytes, int], ...] = ()
+    ) -> bool:
         """
         设置 Stream 过期时间
 
         Args:
             run_id: 运行 ID
             ttl_seconds: 过期时间（秒），默认 24 小时
+            delete_keys: 同时删除的关联 Key
+            set_keys: 同时写入的关联 Key，元素为 (key, value, 过期秒数)（如运行详情缓存）
+                关联 Key 与 EXPIRE 在同一个 MULTI/EXEC 中提交，只需一次网络往返
 
         Returns:
             是否设置成功
         """
         try:
             stream_key = self._stream_key(run_id)
-            return self.redis.expire(stream_key, ttl_seconds)
+            if not delete_keys and not set_keys:
+                return self.redis.expire(stream_key, ttl_seconds)
+
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.expire(stream_key, ttl_seconds)
+            if delete_keys:
+                pipe.delete(*delete_keys)
+            for key, value, key_ttl in set_keys:
+                pipe.set(key, value, ex=key_ttl)
+            return pipe.execute()[0]
         except redis.RedisError as e:
             logger.error(f"Redis expire failed for run {run_id}: {e}")
             return False
@@ -282,6 +373,25 @@ class EventStore:
             logger.error(f"Redis exists check failed for run {run_id}: {e}")
             return False
 
+    def get_ttl(self, run_id: int) -> Optional[int]:
+        """
+        获取 Stream 剩余过期时间
+
+        运行结束时才会设置过期时间，可据此跨进程判断运行是否已结束。
+
+        Args:
+            run_id: 运行 ID
+
+        Returns:
+            剩余秒数；-1 表示未设置过期（运行中），-2 表示 Stream 不存在，读取失败时返回 None
+        """
+        try:
+            stream_key = self._stream_key(run_id)
+            return self.redis.ttl(stream_key)
+        except redis.RedisError as e:
+            logger.error(f"Redis ttl failed for run {run_id}: {e}")
+            return None
+
     def get_length(self, run_id: int) -> int:
         """
         获取 Stream 长度
@@ -299,7 +409,13 @@ class EventStore:
             logger.error(f"Redis xlen failed for run {run_id}: {e}")
             return 0
 
-    def _parse_message(self, run_id: int, msg_id: str, fields: dict) -> StreamEvent:
+    def _parse_message(
+        self,
+        run_id: int,
+        msg_id: str,
+        fields: dict,
+        raw_data: bool = False
+    ) -> StreamEvent:
         """
         解析 Redis Stream 消息为 StreamEvent
 
@@ -307,6 +423,7 @@ class EventStore:
             run_id: 运行 ID
             msg_id: 消息 ID
             fields: 消息字段
+            raw_data: 为 True 时 data 不解析，包装为 orjson.Fragment 原样输出
 
         Returns:
             StreamEvent 实例
@@ -321,11 +438,14 @@ class EventStore:
                 'team_name': fields.get('source_team_name') or None,
             }
 
-        # 解析事件数据
-        try:
-            data = json.loads(fields.get('data', '{}'))
-        except json.JSONDecodeError:
-            data = {}
+        # 解析事件数据（data 由 add() 使用 orjson 写入，可直接作为 JSON 片段输出）
+        if raw_data:
+            data = orjson.Fragment(fields.get('data') or '{}')
+        else:
+            try:
+                data = orjson.loads(fields.get('data', '{}'))
+            except orjson.JSONDecodeError:
+                data = {}
 
         return StreamEvent(
             id=msg_id,
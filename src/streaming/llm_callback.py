@@ -6,7 +6,7 @@ LLM Callback Handler - 追踪 LLM 调用来源
 """
 
 from typing import Any, Callable, Dict, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from ..core.api_models import AgentType, EventCategory, EventAction
 
@@ -22,6 +22,13 @@ class CallerContext:
     agent_type: AgentType
     agent_name: str
     team_name: Optional[str] = None
+    # agent_type 的字符串值，构造时计算一次，每个事件无需再做 isinstance 判断和枚举取值
+    agent_type_value: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.agent_type_value = (
+            self.agent_type.value if isinstance(self.agent_type, AgentType) else self.agent_type
+        )
 
     @classmethod
     def global_supervisor(cls, agent_id: str, agent_name: str = "Global Supervisor") -> 'CallerContext':
@@ -57,7 +64,7 @@ class CallerContext:
         """转换为 source 字典（新版事件格式）"""
         return {
             'agent_id': self.agent_id,
-            'agent_type': self.agent_type.value if isinstance(self.agent_type, AgentType) else self.agent_type,
+            'agent_type': self.agent_type_value,
             'agent_name': self.agent_name,
             'team_name': self.team_name
         }
@@ -66,7 +73,7 @@ class CallerContext:
         """转换为数据库字段（用于持久化）"""
         return {
             'agent_id': self.agent_id,
-            'agent_type': self.agent_type.value if isinstance(self.agent_type, AgentType) else self.agent_type,
+            'agent_type': self.agent_type_value,
             'agent_name': self.agent_name,
             'team_name': self.team_name
         }
@@ -227,6 +234,8 @@ class LLMCallbackHandler:
         self.tool_count = 0
         self.previous_tool_use = None
         self._buffer = []  # 缓冲区，用于累积文本
+        # 来源信息在处理器生命周期内不变，构造时投影一次，所有事件共享（只读）
+        self._source = caller_context.to_source_dict()
 
     def __call__(self, **kwargs: Any) -> None:
         """
@@ -335,7 +344,7 @@ class LLMCallbackHandler:
         }
         """
         event_data = {
-            'source': self.caller_context.to_source_dict(),
+            'source': self._source,
             'event': {
                 'category': category.value,
                 'action': action.value
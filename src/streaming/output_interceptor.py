@@ -58,6 +58,15 @@ class OutputInterceptor:
         'warning': (EventCategory.SYSTEM, EventAction.WARNING),
     }
 
+    # 按优先级排列的 (模式名, 匹配函数, 事件类别, 事件动作)，类定义时构建一次，逐行解析时直接遍历
+    _MATCHERS = tuple(
+        (name, pattern.search, *event)
+        for (name, pattern), event in zip(PATTERNS.items(), map(PATTERN_TO_EVENT.__getitem__, PATTERNS))
+    )
+
+    # 装饰性分隔线使用的字符
+    _SEPARATOR_CHARS = '-=#*─━'
+
     # 标签解析模式（支持可选的 @agent_id 后缀）
     GLOBAL_SUPERVISOR_PATTERN = re.compile(r'\[Global Supervisor(?:\s*\|\s*@([^\]]+))?\]')
     TEAM_SUPERVISOR_PATTERN = re.compile(r'\[Team:\s*([^|\]]+?)\s*\|\s*Supervisor(?:\s*\|\s*@([^\]]+))?\]')
@@ -153,10 +162,8 @@ class OutputInterceptor:
 
     def _is_separator_line(self, text: str) -> bool:
         """检查是否为纯分隔线（无意义的装饰性输出）"""
-        if not text:
-            return True
-        separator_chars = set('-=#*─━')
-        return all(c in separator_chars for c in text)
+        # 去掉分隔字符后为空即为纯分隔线（str.strip 在 C 层完成，无需逐字符判断）
+        return not text.strip(self._SEPARATOR_CHARS)
 
     def _parse_and_emit(self, text: str):
         """解析文本并发射结构化事件"""
@@ -173,15 +180,9 @@ class OutputInterceptor:
         source_info = self._extract_source_info(text_stripped)
 
         # 按优先级匹配模式
-        for pattern_name, pattern in self.PATTERNS.items():
-            match = pattern.search(text_stripped)
+        for pattern_name, search, category, action in self._MATCHERS:
+            match = search(text_stripped)
             if match:
-                # 获取事件类别和动作
-                category, action = self.PATTERN_TO_EVENT.get(
-                    pattern_name,
-                    (EventCategory.SYSTEM, EventAction.WARNING)
-                )
-
                 # 构建 data
                 data = {
                     'raw_text': text_stripped[:500],
@@ -5,6 +5,8 @@ Redis Client - Redis 连接管理
 """
 
 import os
+import threading
+
 import redis
 from typing import Optional
 
@@ -12,6 +14,9 @@ from typing import Optional
 # 全局 Redis 客户端实例
 _redis_client: Optional[redis.Redis] = None
 
+# 并发的首次调用只创建一个客户端（连接池），避免重复创建后被覆盖泄漏
+_client_lock = threading.Lock()
+
 
 def get_redis_client() -> redis.Redis:
     """
@@ -23,7 +28,9 @@ def get_redis_client() -> redis.Redis:
     global _redis_client
 
     if _redis_client is None:
-        _redis_client = _create_redis_client()
+        with _client_lock:
+            if _redis_client is None:
+                _redis_client = _create_redis_client()
 
     return _redis_client
 
@@ -0,0 +1,79 @@
+"""
+Run Cache - 已结束运行的详情缓存
+
+运行进入终态（completed / failed / cancelled）后不再变化，
+将序列化后的详情响应缓存到 Redis，读取时无需访问数据库。
+Redis 不可用时所有操作静默降级，调用方回退到数据库查询。
+
+运行被取消后执行线程可能仍在运行，随后写入最终结果。执行线程结束时以最终详情覆盖缓存，
+读取路径只在缓存不存在时写入（SET NX）：无论两者先后，缓存中最终都是执行结束后的详情。
+"""
+
+import logging
+from typing import Optional
+
+import orjson
+import redis
+
+from .redis_client import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+# 缓存配置
+RUN_CACHE_TTL_SECONDS = 3600  # 1 小时
+
+
+def run_cache_key(run_id: int) -> str:
+    """生成运行详情缓存 Key"""
+    return f"run:{run_id}:detail"
+
+
+def get_cached_run(run_id: int) -> Optional[str]:
+    """
+    获取缓存的运行详情响应
+
+    Args:
+        run_id: 运行 ID
+
+    Returns:
+        序列化后的响应体，未命中时返回 None
+    """
+    try:
+        return get_redis_client().get(run_cache_key(run_id))
+    except redis.RedisError as e:
+        logger.warning(f"Redis run cache read failed for run {run_id}: {e}")
+        return None
+
+
+def render_run_detail(run) -> bytes:
+    """
+    序列化运行详情响应体（/runs/get 与执行线程写入缓存共用，保证两者内容一致）
+
+    Args:
+        run: ExecutionRun 记录
+    """
+    # 数据库数据可信，直接使用 to_dict() 输出，不经过 Pydantic 响应模型校验
+    return orjson.dumps({
+        'success': True,
+        'data': run.to_dict()
+    })
+
+
+def cache_run(run_id: int, body: bytes, ttl_seconds: int = RUN_CACHE_TTL_SECONDS) -> None:
+    """
+    缓存运行详情响应（仅应用于终态运行，读取路径使用）
+
+    只在缓存不存在时写入，不会覆盖执行线程结束时写入的最终详情。
+
+    Args:
+        run_id: 运行 ID
+        body: 序列化后的响应体
+        ttl_seconds: 过期时间（秒）
+    """
+    try:
+        get_redis_client().set(run_cache_key(run_id), body, ex=ttl_seconds, nx=True)
+    except redis.RedisError as e:
+        logger.warning(f"Redis run cache write failed for run {run_id}: {e}")
+
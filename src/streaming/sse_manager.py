@@ -4,15 +4,63 @@ SSE Manager - Server-Sent Events 管理器
 支持双写策略：同时写入内存队列（低延迟 SSE）和 Redis Stream（持久化+断线恢复）。
 """
 
-import json
 import threading
-from queue import Queue, Empty
-from datetime import datetime
-from typing import Generator, Optional, Dict, List
+import time
+from functools import lru_cache
+from queue import Queue, Empty, Full
+from typing import Callable, Generator, Optional, Dict, List
 
+import orjson
+import redis
 from flask import Response
 
-from .event_store import EventStore, StreamEvent, get_event_store
+from .event_store import EventStore, StreamEvent, get_event_store, utc_timestamp
+
+# SSE 响应头
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no',  # 禁用 nginx 缓冲
+    'Access-Control-Allow-Origin': '*',
+}
+
+# 内存事件队列容量：没有客户端消费时队列不会无限增长，
+# 溢出时丢弃最旧的事件（事件已持久化在 Redis Stream，可通过 Last-Event-ID 补齐）
+EVENT_QUEUE_MAXSIZE = 1024
+
+# 合并输出积压事件时单次写出的字节数上限，避免一次写出过大的块
+_SSE_FLUSH_BYTES = 64 * 1024
+
+# 客户端断线后的重连等待时间（毫秒），随事件流开头的 retry 字段下发
+SSE_RETRY_MS = 3000
+_RETRY_FRAME = f"retry: {SSE_RETRY_MS}\n\n".encode()
+
+# 运行结束的生命周期动作，跨进程订阅时据此结束事件流
+_TERMINAL_ACTIONS = frozenset({'completed', 'failed', 'cancelled'})
+
+# 跨进程订阅时 Stream 尚未创建（运行未产生事件）的最大等待轮数
+_MAX_MISSING_POLLS = 6
+
+# 跨进程订阅时每连续空读多少轮核对一次运行状态（执行进程异常退出时不会写入终态事件）
+_STATUS_CHECK_POLLS = 6
+
+# 跨进程订阅的最长空闲时间（秒）：超过该时间没有新事件时结束事件流，避免永久占用 worker 线程
+_MAX_IDLE_SECONDS = 600
+
+
+def _dumps(obj) -> bytes:
+    """使用 orjson 序列化 SSE 事件数据（直接输出 UTF-8 字节串）"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=256)
+def _event_prefix(category: str, action: str) -> bytes:
+    """事件类型行及 data 字段前缀（事件类型为有限集合，每种只格式化和编码一次）"""
+    return f"event: {category}.{action}\ndata: ".encode()
+
+
+# 流关闭事件内容固定，导入时构建一次
+_CLOSE_FRAME = b'event: close\ndata: ' + _dumps({'message': 'Stream closed'}) + b'\n\n'
 
 
 class SSEManager:
@@ -40,12 +88,13 @@ class SSEManager:
             event_store: EventStore 实例，如果未提供则使用全局实例
         """
         self.run_id = run_id
-        self.event_queue: Queue = Queue()
+        self.event_queue: Queue = Queue(maxsize=EVENT_QUEUE_MAXSIZE)
         self.is_active = True
         self._lock = threading.Lock()
         self._sequence = 0
         self._event_store = event_store
         self._last_event_id: Optional[str] = None  # 最后一个事件的 Redis 消息 ID
+        self._overflowed = False  # 内存队列是否因消费过慢而丢弃过事件
 
     @property
     def event_store(self) -> EventStore:
@@ -67,9 +116,8 @@ class SSEManager:
         if not self.is_active:
             return None
 
-        # 生成毫秒精度的 ISO 8601 时间戳
-        now = datetime.utcnow()
-        timestamp = now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond // 1000:03d}Z'
+        # 生成毫秒精度的 ISO 8601 UTC 时间戳
+        timestamp = utc_timestamp()
 
         # 自增序列号
         with self._lock:
@@ -103,7 +151,7 @@ class SSEManager:
         }
 
         # 写入内存队列（低延迟 SSE）
-        self.event_queue.put(full_event)
+        self._enqueue(full_event)
 
         # 更新最后事件 ID
         if message_id:
@@ -116,16 +164,29 @@ class SSEManager:
         with self._lock:
             self.is_active = False
             # 发送结束事件
-            self.event_queue.put({
+            self._enqueue({
                 'event': {'category': 'system', 'action': 'close'},
                 'data': {'message': 'Stream closed'}
             })
 
+    def _enqueue(self, event: Dict):
+        """写入内存队列，队列已满时丢弃最旧的事件（不阻塞执行线程）"""
+        while True:
+            try:
+                self.event_queue.put_nowait(event)
+                return
+            except Full:
+                self._overflowed = True
+                try:
+                    self.event_queue.get_nowait()
+                except Empty:
+                    pass
+
     def generate_events(
         self,
         timeout: float = 30.0,
         initial_events: Optional[List[StreamEvent]] = None
-    ) -> Generator[str, None, None]:
+    ) -> Generator[bytes, None, None]:
         """
         生成 SSE 事件流
 
@@ -133,70 +194,113 @@ class SSEManager:
             timeout: 队列等待超时时间
             initial_events: 初始事件列表（用于断线重连时先发送历史事件）
 
+        客户端消费过慢导致内存队列丢弃事件时，断开本次连接（不发送 close 事件），
+        客户端按 retry 间隔携带 Last-Event-ID 重连，由 Redis Stream 补齐丢弃的事件，
+        每个连接占用的内存始终受队列容量限制。
+
         Yields:
-            格式化的 SSE 事件字符串
+            格式化的 SSE 事件字节串
         """
+        # 连接建立前的丢弃由断线重连的历史事件补齐，只关注本次连接期间的丢弃；
+        # 在首次 yield 之前清除，等待服务器发送 retry 帧期间的丢弃同样需要检测
+        self._overflowed = False
+
+        yield _RETRY_FRAME
+
+        last_id: Optional[str] = None
+        last_sequence = 0
+
+        # 每个连接复用一个写缓冲区，clear() 保留已分配的容量，帧拼接不产生中间 bytes 对象
+        buf = bytearray()
+
         # 先发送初始事件（断线重连恢复的历史事件）
         if initial_events:
             for event in initial_events:
-                yield from self._format_stream_event(event)
+                self._write_stream_event(buf, event)
+                if len(buf) >= _SSE_FLUSH_BYTES:
+                    yield bytes(buf)
+                    buf.clear()
+            if buf:
+                yield bytes(buf)
+                buf.clear()
+            last_id = initial_events[-1].id
+            last_sequence = initial_events[-1].sequence
 
         heartbeat_interval = 15  # 心跳间隔秒数
-        last_heartbeat = datetime.utcnow()
 
         while self.is_active or not self.event_queue.empty():
             try:
-                event = self.event_queue.get(timeout=1.0)
+                # 关闭时一定会入队 close 事件唤醒等待，空闲连接只需按心跳间隔醒来一次
+                event = self.event_queue.get(timeout=heartbeat_interval)
+            except Empty:
+                # 发送心跳保持连接
+                yield f": heartbeat {utc_timestamp()}\n\n".encode()
+                continue
 
+            # 队列中积压的事件写入同一缓冲区，合并为一次输出
+            finished = False
+            while True:
                 # 检查是否是关闭事件
                 event_meta = event.get('event', {})
                 if event_meta.get('category') == 'system' and event_meta.get('action') == 'close':
-                    yield f"event: close\ndata: {json.dumps({'message': 'Stream closed'}, ensure_ascii=False)}\n\n"
+                    buf += _CLOSE_FRAME
+                    finished = True
                     break
 
-                # 格式化 SSE 事件
-                yield from self._format_dict_event(event)
+                # 已通过历史事件发送过的跳过
+                sequence = event.get('sequence')
+                if sequence is None or sequence > last_sequence:
+                    # 消费过慢已丢弃事件：断开连接，由客户端重连后从 Redis Stream 补齐；
+                    # 尚未发送过事件时没有可供重连的位置，从当前事件继续
+                    if self._overflowed:
+                        if last_id:
+                            finished = True
+                            break
+                        self._overflowed = False
+
+                    self._write_dict_event(buf, event)
+                    last_sequence = sequence or last_sequence
+                    last_id = event.get('id') or last_id
+
+                if len(buf) >= _SSE_FLUSH_BYTES:
+                    break
+                try:
+                    event = self.event_queue.get_nowait()
+                except Empty:
+                    break
 
-            except Empty:
-                # 发送心跳保持连接
-                now = datetime.utcnow()
-                if (now - last_heartbeat).seconds >= heartbeat_interval:
-                    yield f": heartbeat {now.isoformat()}Z\n\n"
-                    last_heartbeat = now
+            if buf:
+                yield bytes(buf)
+                buf.clear()
+            if finished:
+                return
 
-    def _format_dict_event(self, event: Dict) -> Generator[str, None, None]:
-        """格式化字典类型的事件为 SSE 字符串"""
+    @staticmethod
+    def _write_dict_event(buf: bytearray, event: Dict) -> None:
+        """将字典类型的事件格式化为 SSE 帧写入缓冲区"""
         event_meta = event.get('event', {})
-        category = event_meta.get('category', 'unknown')
-        action = event_meta.get('action', 'unknown')
-        event_type = f"{category}.{action}"
 
         # 输出 id 字段（用于客户端 Last-Event-ID）
         event_id = event.get('id')
         if event_id:
-            yield f"id: {event_id}\n"
-
-        yield f"event: {event_type}\n"
-        yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
-
-    def _format_stream_event(self, event: StreamEvent) -> Generator[str, None, None]:
-        """格式化 StreamEvent 为 SSE 字符串"""
-        event_type = f"{event.event.get('category', 'unknown')}.{event.event.get('action', 'unknown')}"
-
-        # 构建完整事件数据
-        event_data = {
-            'id': event.id,
-            'run_id': event.run_id,
-            'timestamp': event.timestamp,
-            'sequence': event.sequence,
-            'source': event.source,
-            'event': event.event,
-            'data': event.data
-        }
-
-        yield f"id: {event.id}\n"
-        yield f"event: {event_type}\n"
-        yield f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
+            buf += b'id: '
+            buf += event_id.encode()
+            buf += b'\n'
+
+        buf += _event_prefix(event_meta.get('category', 'unknown'), event_meta.get('action', 'unknown'))
+        buf += _dumps(event)
+        buf += b'\n\n'
+
+    @staticmethod
+    def _write_stream_event(buf: bytearray, event: StreamEvent) -> None:
+        """将 StreamEvent 格式化为 SSE 帧写入缓冲区"""
+        buf += b'id: '
+        buf += event.id.encode()
+        buf += b'\n'
+        buf += _event_prefix(event.event.get('category', 'unknown'), event.event.get('action', 'unknown'))
+        # StreamEvent 字段与事件数据的键及顺序一致，由 orjson 直接序列化 dataclass，无需逐个事件构建中间 dict
+        buf += _dumps(event)
+        buf += b'\n\n'
 
     def create_response(
         self,
@@ -211,15 +315,154 @@ class SSEManager:
         return Response(
             self.generate_events(initial_events=initial_events),
             mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no',  # 禁用 nginx 缓冲
-                'Access-Control-Allow-Origin': '*',
-            }
+            headers=SSE_HEADERS
         )
 
 
+def generate_redis_events(
+    run_id: int,
+    last_event_id: Optional[str] = None,
+    event_store: Optional[EventStore] = None,
+    block_ms: int = 5000,
+    is_run_finished: Optional[Callable[[], bool]] = None,
+    max_idle_seconds: float = _MAX_IDLE_SECONDS
+) -> Generator[bytes, None, None]:
+    """
+    从 Redis Stream 订阅生成 SSE 事件流
+
+    运行由其他 worker 进程执行时（本进程注册表中没有对应的 SSEManager），
+    通过 XREAD 阻塞读取该运行的 Redis Stream，读到终态生命周期事件后结束；
+    Stream 已设置过期时间（运行已结束）、长时间不存在或 Redis 不可用时也会结束。
+    执行进程异常退出时 Stream 既没有终态事件也没有过期时间：连续空读时定期核对运行状态，
+    运行已结束或空闲超过 max_idle_seconds 时结束。
+
+    Args:
+        run_id: 运行 ID
+        last_event_id: 从此消息 ID 之后开始读取，None 表示从头读取
+        event_store: EventStore 实例（可选）
+        block_ms: 每次阻塞读取的等待时间（毫秒），同时作为心跳间隔
+        is_run_finished: 查询运行是否已结束（如数据库中已是终态或已删除），None 表示不核对
+        max_idle_seconds: 最长空闲时间（秒）
+
+    Yields:
+        格式化的 SSE 事件字节串
+    """
+    store = event_store or get_event_store()
+    last_id = last_event_id or '0-0'
+    missing_polls = 0
+    idle_polls = 0
+    idle_since = time.monotonic()
+
+    # 一次读取到的批量事件写入同一缓冲区，合并为一次输出
+    buf = bytearray()
+
+    while True:
+        # 事件数据只转发不读取，保持 Redis 中已序列化的 JSON 原样输出
+        events = store.subscribe(run_id, last_id=last_id, block_ms=block_ms, raw_data=True)
+        for event in events:
+            SSEManager._write_stream_event(buf, event)
+            last_id = event.id
+            if event.event.get('category') == 'lifecycle' and event.event.get('action') in _TERMINAL_ACTIONS:
+                buf += _CLOSE_FRAME
+                yield bytes(buf)
+                return
+        if buf:
+            yield bytes(buf)
+            buf.clear()
+
+        if events:
+            missing_polls = 0
+            idle_polls = 0
+            idle_since = time.monotonic()
+            continue
+
+        ttl = store.get_ttl(run_id)
+        if ttl == -2:
+            missing_polls += 1
+        if ttl is None or ttl >= 0 or missing_polls > _MAX_MISSING_POLLS:
+            yield _CLOSE_FRAME
+            return
+
+        idle_polls += 1
+        if time.monotonic() - idle_since > max_idle_seconds or (
+            is_run_finished is not None
+            and idle_polls % _STATUS_CHECK_POLLS == 0
+            and is_run_finished()
+        ):
+            yield _CLOSE_FRAME
+            return
+
+        yield f": heartbeat {utc_timestamp()}\n\n".encode()
+
+
+def create_redis_response(
+    run_id: int,
+    last_event_id: Optional[str] = None,
+    is_run_finished: Optional[Callable[[], bool]] = None
+) -> Response:
+    """
+    创建基于 Redis Stream 订阅的 Flask SSE 响应（跨 worker 进程读取运行事件）
+
+    Args:
+        run_id: 运行 ID
+        last_event_id: 客户端最后收到的消息 ID（断线重连用）
+        is_run_finished: 查询运行是否已结束，None 表示不核对
+    """
+    return Response(
+        generate_redis_events(run_id, last_event_id=last_event_id, is_run_finished=is_run_finished),
+        mimetype='text/event-stream',
+        headers=SSE_HEADERS
+    )
+
+
+def generate_replay_events(
+    run_id: int,
+    last_event_id: str,
+    event_store: Optional[EventStore] = None
+) -> Generator[bytes, None, None]:
+    """
+    补发已结束运行的剩余事件
+
+    运行已结束后客户端携带 Last-Event-ID 重连（如消费过慢被断开时运行恰好结束），
+    从 Redis Stream 分批读取该 ID 之后的全部事件，发送完毕后以 close 事件结束。
+    读取失败时不发送 close 事件，客户端按 retry 间隔重连后再次补发。
+
+    Args:
+        run_id: 运行 ID
+        last_event_id: 客户端最后收到的消息 ID
+        event_store: EventStore 实例（可选）
+
+    Yields:
+        格式化的 SSE 事件字节串
+    """
+    store = event_store or get_event_store()
+    buf = bytearray()
+    try:
+        for events in store.iter_event_batches(run_id, start_id=f"({last_event_id}", raw_data=True):
+            for event in events:
+                SSEManager._write_stream_event(buf, event)
+            yield bytes(buf)
+            buf.clear()
+    except redis.RedisError:
+        return
+    yield _CLOSE_FRAME
+
+
+def create_replay_response(run_id: int, last_event_id: str) -> Response:
+    """
+    创建补发已结束运行剩余事件的 Flask SSE 响应
+
+    Args:
+        run_id: 运行 ID
+        last_event_id: 客户端最后收到的消息 ID
+    """
+    return Response(
+        generate_replay_events(run_id, last_event_id),
+        mimetype='text/event-stream',
+        headers=SSE_HEADERS
+    )
+
+
 class SSERegistry:
     """SSE 管理器注册表 - 单例模式"""
 
@@ -227,12 +470,16 @@ class SSERegistry:
     _managers: Dict[int, SSEManager] = {}
     _lock = threading.Lock()
 
+    # 已结束运行的终态保留时长（秒），覆盖客户端断线重连的时间窗口
+    RECENTLY_CLOSED_TTL_SECONDS = 60
+
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
                     cls._instance._managers = {}
+                    cls._instance._recently_closed = {}
         return cls._instance
 
     @classmethod
@@ -260,12 +507,44 @@ class SSERegistry:
         """获取 SSE 管理器"""
         return self._managers.get(run_id)
 
-    def remove(self, run_id: int):
-        """移除 SSE 管理器"""
+    def remove(self, run_id: int, status: Optional[str] = None):
+        """
+        移除 SSE 管理器
+
+        Args:
+            run_id: 运行 ID
+            status: 运行终态（可选），传入时在短时间内保留，重连请求无需再查询数据库
+        """
         with self._lock:
             if run_id in self._managers:
                 self._managers[run_id].close()
                 del self._managers[run_id]
+            if status is not None:
+                now = time.monotonic()
+                self._prune_recently_closed(now)
+                self._recently_closed[run_id] = (status, now)
+
+    def recently_closed(self, run_id: int) -> Optional[str]:
+        """
+        获取最近结束运行的终态
+
+        Returns:
+            运行终态；运行未在保留时长内结束时返回 None
+        """
+        entry = self._recently_closed.get(run_id)
+        if entry is None or time.monotonic() - entry[1] > self.RECENTLY_CLOSED_TTL_SECONDS:
+            return None
+        return entry[0]
+
+    def _prune_recently_closed(self, now: float):
+        """清理超过保留时长的终态记录（按结束时间顺序插入，从头部清理即可）"""
+        expired = []
+        for run_id, (_, closed_at) in self._recently_closed.items():
+            if now - closed_at <= self.RECENTLY_CLOSED_TTL_SECONDS:
+                break
+            expired.append(run_id)
+        for run_id in expired:
+            del self._recently_closed[run_id]
 
     def get_all_run_ids(self) -> list:
         """获取所有活跃的运行 ID"""
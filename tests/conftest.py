@@ -0,0 +1,126 @@
+"""
+pytest 公共夹具
+
+API 测试使用临时 SQLite 数据库和进程内 SimpleCache 创建应用，不依赖 MySQL 服务；
+事件流使用内存 EventStore（event_store），其他用到 Redis 的功能在各测试中替换为内存实现。
+"""
+
+import contextlib
+import io
+import os
+
+import pytest
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(BigInteger, 'sqlite')
+def _compile_big_integer_sqlite(type_, compiler, **kw):
+    """SQLite 仅对 INTEGER 主键自增，BIGINT 主键（execution_run.id）按 INTEGER 建表"""
+    return 'INTEGER'
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """使用临时 SQLite 数据库创建的 Flask 应用（整个测试会话共享）"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    os.environ.pop('CACHE_TYPE', None)
+
+    # 应用启动时会打印认证模式等信息
+    with contextlib.redirect_stdout(io.StringIO()):
+        from src.ec2.server import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    """每个测试开始前清空数据表和响应缓存的测试客户端"""
+    from src.api.cache import cache
+    from src.api.routes.models import _invalidate_stats_cache
+    from src.db.database import get_engine
+    from src.db.models import Base
+
+    with get_engine().begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    cache.clear()
+    _invalidate_stats_cache()
+
+    return app.test_client()
+
+
+class FakeEventStore:
+    """
+    内存 EventStore 替身
+
+    add 保存事件并返回递增的消息 ID（"1-0"、"2-0"…），iter_event_batches 按 ID 范围读取已保存的事件；
+    subscribe 按顺序返回预置在 batches 中的事件批次，之后每次都返回空列表；get_ttl 返回 ttl，set_expire 设置 ttl。
+    """
+
+    def __init__(self):
+        self.events = []
+        self.batches = []
+        self.ttl = -1
+        self.subscribed_from = []
+        self.polls = 0
+
+    def add(self, run_id, event_category, event_action, data, source=None, timestamp=None, sequence=None):
+        from src.streaming.event_store import StreamEvent
+
+        message_id = f'{len(self.events) + 1}-0'
+        self.events.append(StreamEvent(
+            id=message_id, run_id=run_id, timestamp=timestamp, sequence=sequence, source=source,
+            event={'category': event_category, 'action': event_action}, data=data
+        ))
+        return message_id
+
+    def iter_event_batches(self, run_id, start_id='-', raw_data=False):
+        after = int(start_id.lstrip('(').split('-')[0]) if start_id != '-' else 0
+        events = [event for event in self.events if int(event.id.split('-')[0]) > after]
+        if events:
+            yield events
+
+    def subscribe(self, run_id, last_id='$', block_ms=5000, raw_data=False):
+        self.subscribed_from.append(last_id)
+        self.polls += 1
+        return self.batches.pop(0) if self.batches else []
+
+    def get_ttl(self, run_id):
+        return self.ttl
+
+    def set_expire(self, run_id, ttl_seconds=86400, delete_keys=(), set_keys=()):
+        self.ttl = ttl_seconds
+        return True
+
+
+@pytest.fixture
+def event_store(monkeypatch):
+    """内存 EventStore，事件流未显式传入 EventStore 时（get_event_store）也使用它"""
+    from src.streaming import sse_manager
+
+    store = FakeEventStore()
+    monkeypatch.setattr(sse_manager, 'get_event_store', lambda: store)
+    return store
+
+
+@pytest.fixture
+def hierarchy_config():
+    """最小的合法层级团队配置（一个团队、一个 Worker），不含名称"""
+    return {
+        'global_supervisor_agent': {'system_prompt': 'g'},
+        'teams': [{
+            'name': 't',
+            'team_supervisor_agent': {'system_prompt': 's'},
+            'workers': [{'name': 'w', 'role': 'r', 'system_prompt': 'p'}]
+        }]
+    }
+
+
+@pytest.fixture
+def db_session(app):
+    """独立的数据库会话，用于在测试中直接准备或修改数据"""
+    from src.db.database import create_new_session
+
+    session = create_new_session()
+    yield session
+    session.close()
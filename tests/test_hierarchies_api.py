@@ -0,0 +1,56 @@
+"""
+层级团队创建接口测试
+
+覆盖创建成功、参数校验失败、名称重复以及未预期异常时的 JSON 错误响应。
+"""
+
+from src.api.routes import hierarchies
+
+
+CREATE_URL = '/api/executor/v1/hierarchies/create'
+
+
+def test_create_hierarchy(client, hierarchy_config):
+    """创建成功，配置只包含持久化字段"""
+    response = client.post(CREATE_URL, json={'name': 'h1', **hierarchy_config})
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['name'] == 'h1' and data['version'] == 1
+    assert list(data['config']) == [
+        'execution_mode', 'enable_context_sharing', 'global_supervisor_agent', 'teams'
+    ]
+
+
+def test_create_hierarchy_validation_error(client):
+    """缺少必填字段时返回 400 及字段级错误详情"""
+    response = client.post(CREATE_URL, json={'name': 'h1'})
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['success'] is False
+    assert {detail['field'] for detail in body['details']} == {'global_supervisor_agent', 'teams'}
+
+
+def test_create_hierarchy_duplicate_name(client, hierarchy_config):
+    """名称重复由数据库唯一索引检测，返回 400"""
+    assert client.post(CREATE_URL, json={'name': 'h1', **hierarchy_config}).status_code == 200
+
+    response = client.post(CREATE_URL, json={'name': 'h1', **hierarchy_config})
+
+    assert response.status_code == 400
+    assert '已存在' in response.get_json()['error']
+
+
+def test_create_hierarchy_unexpected_error_returns_json(client, hierarchy_config, monkeypatch):
+    """校验通过后出现未预期异常时仍返回 JSON 格式的 500 响应"""
+    def broken_check(config):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(hierarchies, 'check_agent_ids_unique_in_hierarchy', broken_check)
+
+    response = client.post(CREATE_URL, json={'name': 'h1', **hierarchy_config})
+
+    assert response.status_code == 500
+    assert response.is_json
+    assert response.get_json() == {'success': False, 'error': 'boom'}
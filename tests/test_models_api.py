@@ -0,0 +1,190 @@
+"""
+模型接口测试
+
+覆盖 /list 的游标分页（游标编解码、无效游标、下一页游标的边界）、按 ids 批量查询，
+以及 /get、/list 的 ETag 和 /get 响应缓存。
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.db.models import AIModel
+from src.db.repositories import ModelRepository
+from src.db.repositories.model_repo import encode_cursor, decode_cursor
+
+
+LIST_URL = '/api/executor/v1/models/list'
+
+BASE_TIME = datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def model_ids(client, db_session):
+    """5 个模型的 ID，按创建时间从新到旧排列"""
+    ids = [str(uuid.uuid4()) for _ in range(5)]
+    db_session.add_all([
+        AIModel(id=model_id, name=f'model-{i}', model_id='anthropic.claude', created_at=BASE_TIME + timedelta(minutes=i))
+        for i, model_id in enumerate(ids)
+    ])
+    db_session.commit()
+    return ids[::-1]
+
+
+def list_page(client, **body):
+    """请求 /list 并返回 data"""
+    response = client.post(LIST_URL, json=body)
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_cursor_round_trip():
+    """游标编码后可还原为原始的 (created_at, id)"""
+    created_at = datetime(2025, 1, 1, 12, 30, 45, 123456)
+
+    assert decode_cursor(encode_cursor(created_at, 'a|b')) == (created_at, 'a|b')
+
+
+def test_invalid_cursor_returns_400(client):
+    """无法解码的游标返回 400"""
+    response = client.post(LIST_URL, json={'cursor': 'not-a-cursor'})
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['success'] is False and '无效的分页游标' in body['error']
+
+
+def test_cursor_pagination_walks_all_rows(client, model_ids):
+    """沿 nextCursor 翻页可按顺序取到全部数据，且不重复"""
+    first = list_page(client, size=2)
+    second = list_page(client, size=2, cursor=first['nextCursor'])
+    third = list_page(client, size=2, cursor=second['nextCursor'])
+
+    pages = [first, second, third]
+    assert [row['id'] for page in pages for row in page['content']] == model_ids
+    assert 'nextCursor' not in third
+
+
+def test_no_next_cursor_at_exact_size_boundary(client, model_ids):
+    """剩余行数恰好等于 size 时不返回 nextCursor，避免客户端多请求一次空页"""
+    first = list_page(client, size=3)
+    second = list_page(client, size=2, cursor=first['nextCursor'])
+
+    assert [row['id'] for row in second['content']] == model_ids[3:]
+    assert 'nextCursor' not in second
+
+    # 页码分页同样适用
+    assert 'nextCursor' not in list_page(client, size=5)
+    assert 'nextCursor' in list_page(client, size=4)
+
+
+def test_list_by_ids(client, model_ids):
+    """按 ids 批量查询，只返回存在的模型，总数按 ids 计算"""
+    data = list_page(client, ids=[model_ids[1], model_ids[3], str(uuid.uuid4())])
+
+    assert [row['id'] for row in data['content']] == [model_ids[1], model_ids[3]]
+    assert data['totalElements'] == 2
+    assert 'description' not in data['content'][0]
+
+
+def test_list_by_ids_combined_with_filter(client, model_ids, db_session):
+    """ids 与 is_active 过滤同时生效"""
+    db_session.query(AIModel).filter(AIModel.id == model_ids[1]).update({'is_active': False})
+    db_session.commit()
+
+    data = list_page(client, ids=[model_ids[1], model_ids[3]], is_active=True)
+
+    assert [row['id'] for row in data['content']] == [model_ids[3]]
+    assert data['totalElements'] == 1
+
+
+
+def test_total_reflects_is_active_update(client, model_ids):
+    """修改激活状态后，按 is_active 筛选的缓存总数立即更新"""
+    assert list_page(client, is_active=True)['totalElements'] == 5
+
+    client.post('/api/executor/v1/models/update', json={'id': model_ids[0], 'is_active': False})
+
+    assert list_page(client, is_active=True)['totalElements'] == 4
+    assert list_page(client, is_active=False)['totalElements'] == 1
+
+GET_URL = '/api/executor/v1/models/get'
+UPDATE_URL = '/api/executor/v1/models/update'
+
+
+def test_get_etag_and_not_modified(client, model_ids):
+    """/get 返回 ETag，携带 If-None-Match 且未变化时返回空响应体的 304"""
+    first = client.post(GET_URL, json={'id': model_ids[0]})
+    etag = first.headers['ETag']
+
+    response = client.post(GET_URL, json={'id': model_ids[0]}, headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_get_etag_changes_on_rapid_updates(client, model_ids):
+    """同一秒内的连续两次更新产生不同的 ETag，旧 ETag 不再返回 304"""
+    etag0 = client.post(GET_URL, json={'id': model_ids[0]}).headers['ETag']
+    client.post(UPDATE_URL, json={'id': model_ids[0], 'temperature': 0.1})
+    etag1 = client.post(GET_URL, json={'id': model_ids[0]}).headers['ETag']
+    client.post(UPDATE_URL, json={'id': model_ids[0], 'temperature': 0.2})
+    response = client.post(GET_URL, json={'id': model_ids[0]}, headers={'If-None-Match': etag1})
+
+    assert len({etag0, etag1, response.headers['ETag']}) == 3
+    assert response.status_code == 200
+    assert response.get_json()['data']['temperature'] == 0.2
+
+
+def test_list_etag_and_not_modified(client, model_ids):
+    """/list 的 ETag 随列表内容变化"""
+    etag = client.post(LIST_URL, json={'size': 2}).headers['ETag']
+
+    response = client.post(LIST_URL, json={'size': 2}, headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+
+    client.post(UPDATE_URL, json={'id': model_ids[0], 'name': 'renamed'})
+    response = client.post(LIST_URL, json={'size': 2}, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_get_serves_cached_body(client, model_ids, monkeypatch):
+    """版本未变化时直接返回缓存的响应体，不再读取整行"""
+    first = client.post(GET_URL, json={'id': model_ids[0]})
+
+    def fail_get_by_id(self, model_id):
+        raise AssertionError('缓存命中时不应读取整行')
+
+    monkeypatch.setattr(ModelRepository, 'get_by_id', fail_get_by_id)
+    response = client.post(GET_URL, json={'id': model_ids[0]})
+
+    assert response.status_code == 200
+    assert response.data == first.data
+
+
+def test_get_cache_sees_update_from_other_worker(client, model_ids, db_session):
+    """其他 worker 的更新（本进程缓存未失效）通过版本号校验后不会返回过期数据"""
+    client.post(GET_URL, json={'id': model_ids[0]})
+
+    # 直接更新数据库模拟其他 worker：本进程的缓存未被删除，updated_at 也可能仍在同一秒
+    db_session.query(AIModel).filter(AIModel.id == model_ids[0]).update(
+        {'temperature': 0.3, 'version': AIModel.version + 1}
+    )
+    db_session.commit()
+
+    response = client.post(GET_URL, json={'id': model_ids[0]})
+
+    assert response.get_json()['data']['temperature'] == 0.3
+
+
+def test_get_after_delete_returns_404(client, model_ids):
+    """删除后不再返回缓存的响应体"""
+    client.post(GET_URL, json={'id': model_ids[0]})
+    client.post('/api/executor/v1/models/delete', json={'id': model_ids[0]})
+
+    response = client.post(GET_URL, json={'id': model_ids[0]})
+
+    assert response.status_code == 404
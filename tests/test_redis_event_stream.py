@@ -0,0 +1,134 @@
+"""
+跨 worker 事件流测试
+
+运行由其他 worker 进程执行时，/runs/stream 通过 Redis Stream 订阅其事件（generate_redis_events）。
+使用内存 EventStore（conftest 中的 event_store），验证事件转发以及各种结束条件，
+尤其是执行进程异常退出（Stream 没有终态事件、也没有设置过期时间）时事件流不会无限发送心跳。
+"""
+
+import pytest
+
+from src.db.models import ExecutionRun
+from src.streaming import sse_manager
+from src.streaming.event_store import StreamEvent
+from src.streaming.sse_manager import generate_redis_events
+
+
+CLOSE_FRAME = b'event: close\n'
+
+
+def make_event(run_id: int, seq: int, category: str = 'llm', action: str = 'stream') -> StreamEvent:
+    """构建测试事件"""
+    return StreamEvent(
+        id=f'{seq}-0',
+        run_id=run_id,
+        timestamp='2025-01-01T00:00:00.000Z',
+        sequence=seq,
+        source=None,
+        event={'category': category, 'action': action},
+        data={'n': seq}
+    )
+
+
+def collect(generator, max_frames: int = 1000) -> bytes:
+    """读取事件流直到结束；超过 max_frames 仍未结束视为无限流"""
+    frames = []
+    for frame in generator:
+        frames.append(frame)
+        if len(frames) > max_frames:
+            pytest.fail('事件流没有结束')
+    return b''.join(frames)
+
+
+def test_relays_events_and_closes_on_terminal_event(event_store):
+    """转发事件，读到终态生命周期事件后发送 close 并结束"""
+    event_store.batches = [
+        [make_event(1, 1), make_event(1, 2)],
+        [make_event(1, 3, 'lifecycle', 'completed')],
+    ]
+
+    body = collect(generate_redis_events(1, last_event_id='0-5', event_store=event_store))
+
+    assert body.count(b'event: llm.stream\n') == 2
+    assert b'event: lifecycle.completed\n' in body
+    assert body.endswith(b'\n\n') and CLOSE_FRAME in body
+    # 从 Last-Event-ID 开始订阅，之后从上一批最后一条继续
+    assert event_store.subscribed_from == ['0-5', '2-0']
+
+
+def test_closes_when_stream_has_expiry(event_store):
+    """Stream 已设置过期时间（运行已结束）时结束"""
+    event_store.ttl = 3600
+
+    body = collect(generate_redis_events(1, event_store=event_store))
+
+    assert body == sse_manager._CLOSE_FRAME
+
+
+def test_closes_when_run_finished_without_terminal_event(event_store):
+    """执行进程异常退出：Stream 无终态事件、无过期时间，核对到运行已结束后结束"""
+    checks = []
+
+    def is_run_finished():
+        checks.append(event_store.polls)
+        return True
+
+    body = collect(generate_redis_events(1, event_store=event_store, is_run_finished=is_run_finished))
+
+    assert body.endswith(sse_manager._CLOSE_FRAME)
+    # 连续空读达到核对间隔时才查询运行状态，不是每次空读都查询
+    assert checks == [sse_manager._STATUS_CHECK_POLLS]
+    assert body.count(b': heartbeat') == sse_manager._STATUS_CHECK_POLLS - 1
+
+
+def test_keeps_streaming_while_run_is_active(event_store):
+    """运行仍在进行时继续发送心跳，直到空闲超时"""
+    generator = generate_redis_events(1, event_store=event_store, is_run_finished=lambda: False)
+    frames = [next(generator) for _ in range(sse_manager._STATUS_CHECK_POLLS * 3)]
+
+    assert all(frame.startswith(b': heartbeat') for frame in frames)
+    generator.close()
+
+
+def test_closes_after_max_idle_time(event_store):
+    """无法确认运行状态（运行记录仍是 running）时，空闲超过上限后结束"""
+    event_store.batches = [[make_event(1, 1)]]
+
+    body = collect(generate_redis_events(
+        1, event_store=event_store, is_run_finished=lambda: False, max_idle_seconds=0
+    ))
+
+    assert b'event: llm.stream\n' in body
+    assert body.endswith(sse_manager._CLOSE_FRAME)
+
+
+def test_stream_route_subscribes_to_redis_for_other_worker_runs(client, db_session, event_store):
+    """本进程没有该运行的 SSEManager 时，/runs/stream 从 Redis 订阅，并按数据库状态结束"""
+    db_session.add(ExecutionRun(id=42, hierarchy_id='h', task='t', status='running'))
+    db_session.commit()
+    event_store.batches = [[make_event(42, 1)]]
+
+    response = client.get('/api/executor/v1/runs/stream?id=42', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    # 执行进程异常退出后，运行状态由其他途径（如取消）更新为终态
+    db_session.query(ExecutionRun).filter(ExecutionRun.id == 42).update({'status': 'cancelled'})
+    db_session.commit()
+
+    body = collect(response.response)
+    response.close()
+
+    assert b'id: 1-0\nevent: llm.stream\n' in body
+    assert body.endswith(sse_manager._CLOSE_FRAME)
+
+
+def test_stream_route_rejects_finished_run(client, db_session):
+    """运行已结束时不再订阅事件流"""
+    db_session.add(ExecutionRun(id=43, hierarchy_id='h', task='t', status='completed'))
+    db_session.commit()
+
+    response = client.get('/api/executor/v1/runs/stream?id=43')
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
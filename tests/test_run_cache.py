@@ -0,0 +1,119 @@
+"""
+运行详情缓存测试
+
+运行被取消后执行线程可能仍在运行并随后写入最终结果。/runs/get 读取到的中间结果
+不能在缓存中保留：执行线程结束时以最终详情覆盖缓存，读取路径只在缓存不存在时写入。
+"""
+
+import orjson
+import pytest
+
+from src.db.models import ExecutionRun
+from src.streaming import run_cache
+from src.streaming.event_store import EventStore
+
+
+GET_URL = '/api/executor/v1/runs/get'
+
+
+class FakeRedis:
+    """内存 Redis 替身：支持 get / set(ex, nx) / expire 及事务管道"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """按顺序记录命令，execute 时依次执行"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((getattr(self.client, name), args, kwargs))
+        return command
+
+    def execute(self):
+        return [fn(*args, **kwargs) for fn, args, kwargs in self.commands]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """替换运行详情缓存使用的 Redis 客户端"""
+    client = FakeRedis()
+    monkeypatch.setattr(run_cache, 'get_redis_client', lambda: client)
+    return client
+
+
+def finish_run(db_session, run_id: int, client: FakeRedis):
+    """模拟执行线程结束：写入最终结果，并在设置 Stream 过期时间的同一事务中写入最终详情"""
+    db_session.query(ExecutionRun).filter(ExecutionRun.id == run_id).update(
+        {'status': 'completed', 'result': 'final'}
+    )
+    db_session.commit()
+    run = db_session.get(ExecutionRun, run_id)
+    EventStore(redis_client=client).set_expire(
+        run_id, set_keys=((run_cache.run_cache_key(run_id), run_cache.render_run_detail(run), 60),)
+    )
+
+
+def get_detail(client, run_id: int) -> dict:
+    """请求 /runs/get 并返回 data"""
+    return client.post(GET_URL, json={'id': run_id}).get_json()['data']
+
+
+@pytest.fixture
+def cancelled_run(client, db_session):
+    """已被取消、执行线程尚未结束的运行"""
+    db_session.add(ExecutionRun(id=201, hierarchy_id='h', task='t', status='cancelled'))
+    db_session.commit()
+    return 201
+
+
+def test_final_detail_replaces_interim_cache(client, db_session, fake_redis, cancelled_run):
+    """执行线程结束前读取并缓存的中间结果，被执行线程写入的最终详情覆盖"""
+    assert get_detail(client, cancelled_run)['result'] is None
+
+    finish_run(db_session, cancelled_run, fake_redis)
+
+    data = get_detail(client, cancelled_run)
+    assert data['status'] == 'completed' and data['result'] == 'final'
+
+
+def test_late_read_does_not_overwrite_final_detail(client, db_session, fake_redis, cancelled_run, monkeypatch):
+    """读取路径在执行线程结束前读到数据库、结束后才写缓存时，不覆盖最终详情"""
+    stale_body = run_cache.render_run_detail(db_session.get(ExecutionRun, cancelled_run))
+
+    finish_run(db_session, cancelled_run, fake_redis)
+    run_cache.cache_run(cancelled_run, stale_body)
+
+    assert orjson.loads(fake_redis.get(run_cache.run_cache_key(cancelled_run)))['data']['result'] == 'final'
+
+
+def test_active_run_is_not_cached(client, db_session, fake_redis):
+    """未结束的运行不缓存"""
+    db_session.add(ExecutionRun(id=202, hierarchy_id='h', task='t', status='running'))
+    db_session.commit()
+
+    assert get_detail(client, 202)['status'] == 'running'
+    assert fake_redis.data == {}
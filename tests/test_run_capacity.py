@@ -0,0 +1,173 @@
+"""
+运行名额测试
+
+未结束的运行数达到 MAX_ACTIVE_RUNS 时 /runs/start 返回 503；
+名额占用后、提交到线程池前的任何一步失败，以及执行线程的创建会话和清理步骤失败，
+都必须释放名额，否则名额会逐渐耗尽。
+"""
+
+import threading
+
+import pytest
+
+from src.db.models import ExecutionRun, HierarchyTeam, RunStatus
+from src.runner import run_manager
+from src.runner.run_manager import RunManager
+
+
+START_URL = '/api/executor/v1/runs/start'
+
+
+class FakeExecutor:
+    """线程池替身：只记录提交的任务，不执行"""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        if self.error is not None:
+            raise self.error
+        self.submitted.append(args[0])
+
+
+@pytest.fixture
+def manager(client, monkeypatch):
+    """名额为 1、不实际执行运行的 RunManager"""
+    manager = RunManager.get_instance()
+    monkeypatch.setattr(manager, '_run_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(manager, 'executor', FakeExecutor())
+    return manager
+
+
+@pytest.fixture
+def hierarchy_id(client, hierarchy_config):
+    """已创建的层级团队 ID"""
+    response = client.post('/api/executor/v1/hierarchies/create', json={'name': 'h1', **hierarchy_config})
+    return response.get_json()['data']['id']
+
+
+def slot_available(manager: RunManager) -> bool:
+    """名额是否可用（检查后立即归还）"""
+    if not manager._run_slots.acquire(blocking=False):
+        return False
+    manager._run_slots.release()
+    return True
+
+
+def test_start_run_rejected_when_capacity_reached(client, manager, hierarchy_id):
+    """名额用尽时返回 503，且不创建运行记录"""
+    first = client.post(START_URL, json={'hierarchy_id': hierarchy_id, 'task': 'a'})
+    assert first.status_code == 200
+
+    response = client.post(START_URL, json={'hierarchy_id': hierarchy_id, 'task': 'b'})
+
+    assert response.status_code == 503
+    assert response.get_json()['success'] is False
+    assert len(manager.executor.submitted) == 1
+    manager.sse_registry.remove(first.get_json()['data']['id'])
+
+
+def test_slot_released_when_hierarchy_missing(client, manager):
+    """层级团队不存在（404）时释放名额"""
+    response = client.post(START_URL, json={'hierarchy_id': 'missing', 'task': 'a'})
+
+    assert response.status_code == 404
+    assert slot_available(manager)
+
+
+def test_slot_released_when_run_create_fails(client, manager, hierarchy_id, monkeypatch):
+    """创建运行记录失败时释放名额"""
+    def broken_create(self, data):
+        raise RuntimeError('db down')
+
+    monkeypatch.setattr('src.db.repositories.RunRepository.create', broken_create)
+
+    response = client.post(START_URL, json={'hierarchy_id': hierarchy_id, 'task': 'a'})
+
+    assert response.status_code == 500
+    assert slot_available(manager)
+
+
+def test_slot_released_when_config_build_fails(client, manager, hierarchy_id, db_session, monkeypatch):
+    """生成执行配置失败时释放名额并清理运行状态"""
+    def broken_config(self):
+        raise RuntimeError('bad config')
+
+    monkeypatch.setattr(HierarchyTeam, 'to_execution_config', broken_config)
+
+    response = client.post(START_URL, json={'hierarchy_id': hierarchy_id, 'task': 'a'})
+
+    assert response.status_code == 500
+    assert slot_available(manager)
+    run = db_session.query(ExecutionRun).one()
+    assert run.status == RunStatus.FAILED.value and run.error == 'bad config'
+    assert manager.sse_registry.get(run.id) is None
+    assert run.id not in manager._active_runs and run.id not in manager._cancellation_flags
+
+
+def test_slot_released_when_submit_fails(client, manager, hierarchy_id, db_session, monkeypatch):
+    """线程池拒绝提交（如已关闭）时释放名额，运行记录标记为失败"""
+    monkeypatch.setattr(manager, 'executor', FakeExecutor(RuntimeError('cannot schedule new futures')))
+
+    response = client.post(START_URL, json={'hierarchy_id': hierarchy_id, 'task': 'a'})
+
+    assert response.status_code == 500
+    assert slot_available(manager)
+    run = db_session.query(ExecutionRun).one()
+    assert run.status == RunStatus.FAILED.value
+    assert manager.sse_registry.get(run.id) is None
+
+
+@pytest.fixture
+def executing_run(manager, event_store, db_session, monkeypatch):
+    """已占用名额、等待在线程中执行的运行（执行本身直接失败，不调用 LLM）"""
+    def execute_hierarchy(config):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(run_manager, '_get_execute_hierarchy', lambda: execute_hierarchy)
+    monkeypatch.setattr(run_manager, 'get_event_store', lambda: event_store)
+    db_session.add(ExecutionRun(id=301, hierarchy_id='h', task='t', status='pending'))
+    db_session.commit()
+
+    assert manager._run_slots.acquire(blocking=False)
+    with manager._run_lock:
+        manager._cancellation_flags[301] = threading.Event()
+        manager._active_runs[301] = {'status': 'pending', 'started_at': None, 'hierarchy_id': 'h'}
+    sse = manager.sse_registry.register(301, event_store=event_store)
+    return lambda: manager._execute_run(301, {}, 't', sse, manager._cancellation_flags[301])
+
+
+def test_slot_released_after_failed_execution(manager, executing_run, db_session):
+    """执行失败时记录失败状态，清理完成后释放名额"""
+    executing_run()
+
+    assert slot_available(manager)
+    assert db_session.get(ExecutionRun, 301).status == RunStatus.FAILED.value
+    assert manager.sse_registry.get(301) is None
+
+
+def test_slot_released_when_session_creation_fails(manager, executing_run, monkeypatch):
+    """执行线程创建数据库会话失败时同样执行清理并释放名额"""
+    def broken_session():
+        raise RuntimeError('db down')
+
+    monkeypatch.setattr(run_manager, 'create_new_session', broken_session)
+
+    executing_run()
+
+    assert slot_available(manager)
+    assert manager.sse_registry.get(301) is None and 301 not in manager._active_runs
+
+
+def test_slot_released_when_cleanup_fails(manager, executing_run, monkeypatch):
+    """清理步骤（移除 SSE 注册）异常时名额仍被释放"""
+    def broken_remove(run_id, status=None):
+        raise RuntimeError('registry broken')
+
+    monkeypatch.setattr(manager.sse_registry, 'remove', broken_remove)
+
+    with pytest.raises(RuntimeError, match='registry broken'):
+        executing_run()
+
+    assert slot_available(manager)
@@ -0,0 +1,252 @@
+"""
+本进程运行的事件流测试
+
+运行在本进程执行时，/runs/stream 从 SSERegistry 中的 SSEManager 读取事件。
+EventStore 替换为内存实现，验证 GET 查询参数 / POST 请求体两种传参方式，
+已结束运行的重连（补发剩余事件、无需查询数据库），以及消费过慢时的内存队列上限和断开策略。
+"""
+
+import re
+
+import pytest
+import redis
+
+from src.db.models import ExecutionRun
+from src.db.repositories import RunRepository
+from src.streaming import sse_manager
+from src.streaming.event_store import StreamEvent
+from src.streaming.sse_manager import SSERegistry
+
+
+STREAM_URL = '/api/executor/v1/runs/stream'
+
+
+@pytest.fixture
+def registry():
+    """测试结束时移除本测试注册的 SSE 管理器"""
+    registry = SSERegistry.get_instance()
+    registered = set(registry.get_all_run_ids())
+    yield registry
+    for run_id in set(registry.get_all_run_ids()) - registered:
+        registry.remove(run_id)
+
+
+def finished_manager(registry, event_store, run_id: int):
+    """注册一个已发出一条事件并结束的 SSE 管理器"""
+    manager = registry.register(run_id, event_store=event_store)
+    manager.emit({'event': {'category': 'llm', 'action': 'stream'}, 'data': {'text': 'hi'}})
+    manager.close()
+    return manager
+
+
+def test_stream_by_query_param(client, registry, event_store):
+    """GET 通过查询参数 id 建立连接（EventSource 无法发送请求体）"""
+    finished_manager(registry, event_store, 101)
+
+    response = client.get(f'{STREAM_URL}?id=101')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data()
+    assert b'id: 1-0\nevent: llm.stream\n' in body
+    assert body.endswith(sse_manager._CLOSE_FRAME)
+
+
+def test_stream_by_json_body(client, registry, event_store):
+    """POST 请求体传入 id 的方式仍然可用"""
+    finished_manager(registry, event_store, 102)
+
+    response = client.post(STREAM_URL, json={'id': 102})
+
+    assert response.status_code == 200
+    assert b'id: 1-0\nevent: llm.stream\n' in response.get_data()
+
+
+@pytest.mark.parametrize('query', ['', '?id=', '?id=abc'])
+def test_stream_invalid_query_param(client, query):
+    """查询参数缺失或不是整数时返回 400"""
+    response = client.get(f'{STREAM_URL}{query}')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'error': '无效的运行 ID'}
+
+
+def test_stream_unknown_run(client):
+    """运行不存在时返回 404"""
+    response = client.get(f'{STREAM_URL}?id=999')
+
+    assert response.status_code == 404
+
+
+def test_connect_after_finish_skips_db(client, registry, event_store, monkeypatch):
+    """刚结束的运行由注册表保留终态，不带 Last-Event-ID 的连接直接返回 400，不查询数据库"""
+    finished_manager(registry, event_store, 103)
+    registry.remove(103, status='completed')
+
+    def fail_get_by_id(self, run_id):
+        raise AssertionError('不应查询数据库')
+
+    monkeypatch.setattr(RunRepository, 'get_by_id', fail_get_by_id)
+    response = client.get(f'{STREAM_URL}?id=103')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == '运行已结束，状态: completed'
+
+
+def test_reconnect_after_finish_replays_remaining_events(client, registry, event_store, monkeypatch):
+    """刚结束的运行携带 Last-Event-ID 重连时补发剩余事件并以 close 结束，不查询数据库"""
+    finished_manager(registry, event_store, 109)
+    event_store.add(109, 'lifecycle', 'completed', {})
+    registry.remove(109, status='completed')
+
+    def fail_get_by_id(self, run_id):
+        raise AssertionError('不应查询数据库')
+
+    monkeypatch.setattr(RunRepository, 'get_by_id', fail_get_by_id)
+    response = client.get(f'{STREAM_URL}?id=109', headers={'Last-Event-ID': '1-0'})
+
+    assert response.status_code == 200
+    body = response.get_data()
+    assert re.findall(rb'^id: (\S+)$', body, re.M) == [b'2-0']
+    assert b'event: lifecycle.completed\n' in body
+    assert body.endswith(sse_manager._CLOSE_FRAME)
+
+
+def test_reconnect_to_finished_run_from_db_replays(client, db_session, event_store):
+    """注册表中已没有终态记录时按数据库状态判断，携带 Last-Event-ID 同样补发剩余事件"""
+    db_session.add(ExecutionRun(id=110, hierarchy_id='h', task='t', status='failed'))
+    db_session.commit()
+    for _ in range(3):
+        event_store.add(110, 'llm', 'stream', {})
+
+    replay = client.get(f'{STREAM_URL}?id=110', headers={'Last-Event-ID': '1-0'})
+    rejected = client.get(f'{STREAM_URL}?id=110')
+
+    assert re.findall(rb'^id: (\S+)$', replay.get_data(), re.M) == [b'2-0', b'3-0']
+    assert replay.get_data().endswith(sse_manager._CLOSE_FRAME)
+    assert rejected.status_code == 400
+
+
+def test_recently_closed_expires(registry, monkeypatch):
+    """终态只在保留时长内有效，过期后回退到数据库查询"""
+    registry.remove(104, status='failed')
+    assert registry.recently_closed(104) == 'failed'
+
+    now = sse_manager.time.monotonic()
+    monkeypatch.setattr(
+        sse_manager.time, 'monotonic', lambda: now + SSERegistry.RECENTLY_CLOSED_TTL_SECONDS + 1
+    )
+
+    assert registry.recently_closed(104) is None
+
+
+def emit_events(manager, count: int):
+    """连续发出 count 条 LLM 输出事件"""
+    for i in range(count):
+        manager.emit({'event': {'category': 'llm', 'action': 'stream'}, 'data': {'n': i}})
+
+
+def test_queue_is_bounded(registry, event_store, monkeypatch):
+    """消费者不读取时内存队列不超过容量，丢弃最旧的事件"""
+    monkeypatch.setattr(sse_manager, 'EVENT_QUEUE_MAXSIZE', 4)
+    manager = registry.register(105, event_store=event_store)
+
+    emit_events(manager, 10)
+
+    assert manager.event_queue.qsize() == 4
+    assert manager.event_queue.get_nowait()['data'] == {'n': 6}
+
+
+def test_slow_consumer_is_disconnected(registry, event_store, monkeypatch):
+    """已发送过事件的连接发生丢弃时断开（不发送 close），客户端携带 Last-Event-ID 重连补齐"""
+    monkeypatch.setattr(sse_manager, 'EVENT_QUEUE_MAXSIZE', 4)
+    manager = registry.register(106, event_store=event_store)
+    generator = manager.generate_events()
+
+    assert next(generator) == sse_manager._RETRY_FRAME
+    emit_events(manager, 1)
+    assert b'id: 1-0\n' in next(generator)
+
+    emit_events(manager, 10)
+    manager.close()
+
+    # 在丢弃后的第一条事件处断开，不发送后续事件和 close 事件
+    assert list(generator) == []
+
+
+def test_overflow_before_first_event_keeps_streaming(registry, event_store, monkeypatch):
+    """尚未发送任何事件时没有可用于重连的 Last-Event-ID，丢弃后从最早保留的事件继续发送到结束"""
+    monkeypatch.setattr(sse_manager, 'EVENT_QUEUE_MAXSIZE', 4)
+    manager = registry.register(107, event_store=event_store)
+    generator = manager.generate_events()
+    assert next(generator) == sse_manager._RETRY_FRAME
+
+    emit_events(manager, 10)
+    manager.close()
+
+    body = b''.join(generator)
+    # 关闭事件入队时又丢弃了一条，队列中保留 8-0 ~ 10-0
+    assert re.findall(rb'^id: (\S+)$', body, re.M) == [b'8-0', b'9-0', b'10-0']
+    assert body.endswith(sse_manager._CLOSE_FRAME)
+
+
+def test_overflow_while_sending_retry_frame_is_detected(registry, event_store, monkeypatch):
+    """断线重连的连接在发送 retry 帧期间发生丢弃，同样断开以便从 Redis Stream 补齐"""
+    monkeypatch.setattr(sse_manager, 'EVENT_QUEUE_MAXSIZE', 4)
+    manager = registry.register(108, event_store=event_store)
+    history = [StreamEvent(
+        id='0-1', run_id=108, timestamp='2025-01-01T00:00:00.000Z', sequence=0,
+        source=None, event={'category': 'llm', 'action': 'stream'}, data={}
+    )]
+    generator = manager.generate_events(initial_events=history)
+
+    assert next(generator) == sse_manager._RETRY_FRAME
+    emit_events(manager, 10)
+    manager.close()
+
+    # 只发送历史事件，随后在丢弃后的第一条事件处断开
+    body = b''.join(generator)
+    assert re.findall(rb'^id: (\S+)$', body, re.M) == [b'0-1']
+    assert sse_manager._CLOSE_FRAME not in body
+
+
+def test_slow_consumer_receives_tail_after_run_finishes(client, registry, event_store, monkeypatch):
+    """消费过慢被断开时运行恰好结束，重连后仍能收到被丢弃的结尾事件（含终态事件）"""
+    monkeypatch.setattr(sse_manager, 'EVENT_QUEUE_MAXSIZE', 4)
+    manager = registry.register(111, event_store=event_store)
+    generator = manager.generate_events()
+
+    assert next(generator) == sse_manager._RETRY_FRAME
+    emit_events(manager, 1)
+    assert b'id: 1-0\n' in next(generator)
+
+    # 运行结束时的事件突发使队列溢出，随后运行结束（与 _execute_run 的清理顺序一致）
+    emit_events(manager, 10)
+    manager.emit({'event': {'category': 'lifecycle', 'action': 'completed'}, 'data': {}})
+    registry.remove(111, status='completed')
+    assert list(generator) == []
+
+    response = client.get(f'{STREAM_URL}?id=111', headers={'Last-Event-ID': '1-0'})
+
+    assert response.status_code == 200
+    body = response.get_data()
+    assert re.findall(rb'^id: (\S+)$', body, re.M) == [f'{i}-0'.encode() for i in range(2, 13)]
+    assert b'id: 12-0\nevent: lifecycle.completed\n' in body
+    assert body.endswith(sse_manager._CLOSE_FRAME)
+
+
+def test_replay_redis_error_ends_without_close(event_store, monkeypatch):
+    """补发过程中 Redis 读取失败时不发送 close 事件，客户端重连后再次补发"""
+    read_batches = event_store.iter_event_batches
+
+    def broken_batches(run_id, start_id='-', raw_data=False):
+        yield from read_batches(run_id, start_id, raw_data)
+        raise redis.ConnectionError('down')
+
+    monkeypatch.setattr(event_store, 'iter_event_batches', broken_batches)
+    event_store.add(112, 'llm', 'stream', {})
+
+    body = b''.join(sse_manager.generate_replay_events(112, '0-0'))
+
+    assert b'id: 1-0\n' in body
+    assert sse_manager._CLOSE_FRAME not in body